@@ -4,3 +4,6 @@ class CompaniesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.companies'
     verbose_name = 'Bedrijven'
+
+    def ready(self):
+        import apps.companies.signals  # noqa: F401
@@ -0,0 +1,23 @@
+"""
+Signals for companies.
+Houdt gedenormaliseerde bedrijfsnamen op andere modellen bij.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Company
+
+
+@receiver(post_save, sender=Company)
+def sync_vehicle_bedrijf_naam(sender, instance, created, **kwargs):
+    """Werk Vehicle.bedrijf_naam_cache bij als de bedrijfsnaam wijzigt."""
+    if created:
+        return
+    from apps.fleet.models import Vehicle
+
+    # update() slaat auto_now over; updated_at zelf zetten zodat de
+    # gecachte voertuiglijst (sleutel op max(updated_at)) vervalt
+    Vehicle.objects.filter(bedrijf=instance).exclude(
+        bedrijf_naam_cache=instance.naam
+    ).update(bedrijf_naam_cache=instance.naam, updated_at=timezone.now())
@@ -14,6 +14,11 @@ class CoreConfig(AppConfig):
         # Import signals to register them
         from . import signals  # noqa
         
+        # Write the records of LOG_QUEUED_LOGGERS from a background thread
+        from django.conf import settings
+        from .log_queue import start_queue_listeners
+        start_queue_listeners(getattr(settings, 'LOG_QUEUED_LOGGERS', []))
+        
         # Start background metrics collector (only in the main process, not in management commands)
         # Check for RUN_MAIN to avoid duplicate threads in dev server reload
         if os.environ.get('RUN_MAIN') == 'true' or 'gunicorn' in os.environ.get('SERVER_SOFTWARE', ''):
@@ -0,0 +1,68 @@
+"""
+Background writers for slow log handlers.
+
+The loggers in settings.LOG_QUEUED_LOGGERS keep the handlers LOGGING gives
+them, but those handlers are moved behind a logging.handlers.QueueHandler:
+a request thread only puts the record on a queue and a QueueListener
+thread does the writing. This is wired here rather than in LOGGING because
+dictConfig only supports QueueHandler 'handlers' from Python 3.12 on.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+_lock = threading.Lock()
+# (QueueHandler, handlers its listener writes to) per queued logger
+_queued = []
+_listeners = []
+
+
+def _start_listeners():
+    _listeners[:] = [
+        logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        for queue_handler, handlers in _queued
+    ]
+    for listener in _listeners:
+        listener.start()
+
+
+def _stop_listeners():
+    # Flushes what is queued; each listener is stopped once
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _restart_after_fork():
+    # Threads do not survive fork (Celery prefork workers): give the child
+    # new queues and listeners. Records queued at fork time are written by
+    # the parent.
+    for queue_handler, _handlers in _queued:
+        queue_handler.queue = queue.SimpleQueue()
+    _start_listeners()
+
+
+def start_queue_listeners(logger_names):
+    """Move the handlers of the named loggers behind a queue, once per process."""
+    with _lock:
+        if _queued:
+            return
+        for name in logger_names:
+            logger = logging.getLogger(name)
+            handlers = list(logger.handlers)
+            if not handlers:
+                continue
+            for handler in handlers:
+                logger.removeHandler(handler)
+            queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+            logger.addHandler(queue_handler)
+            _queued.append((queue_handler, handlers))
+
+        if not _queued:
+            return
+        _start_listeners()
+        atexit.register(_stop_listeners)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
@@ -40,17 +40,19 @@ class IsAdminOrManager(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        # Superusers always have access
-        if request.user.is_superuser:
-            return True
-        
-        # Admin and gebruiker roles have full access
-        if request.user.rol in ['admin', 'gebruiker']:
+        # The role decision is cached on the request: DRF (and the browsable
+        # API, once per rendered form) may evaluate permissions several times.
+        full_access = getattr(request, '_is_admin_or_manager', None)
+        if full_access is None:
+            # Superusers, admin and gebruiker roles have full access
+            full_access = request.user.is_superuser or request.user.rol in ('admin', 'gebruiker')
+            request._is_admin_or_manager = full_access
+        if full_access:
             return True
         
         # Chauffeurs only have read access (GET, HEAD, OPTIONS)
         if request.user.rol == 'chauffeur':
-            return request.method in ['GET', 'HEAD', 'OPTIONS']
+            return request.method in ('GET', 'HEAD', 'OPTIONS')
         
         return False
 
@@ -0,0 +1,26 @@
+"""Custom renderer classes."""
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+_fallback_encoder = JSONEncoder()
+
+
+class OrjsonRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson.
+    
+    Produces the same compact UTF-8 output as DRF's JSONRenderer. Types
+    orjson does not know (Decimal, lazy strings, ...) are handed to DRF's
+    encoder.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_fallback_encoder.default, option=self.options)
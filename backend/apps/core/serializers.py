@@ -1,10 +1,43 @@
 """
 Core app serializers.
 """
+import copy
+
 from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
 from .models import AppSettings, CustomFont, ReminderJobLog, EmailProfile, Administratie
 
 
+class CachedFieldsMixin:
+    """
+    Cache the result of ModelSerializer.get_fields() per serializer class.
+
+    Building the fields introspects the model on every instantiation, which
+    dominates CPU on list endpoints. The field templates are built once per
+    class; each instance gets its own copies so binding (field_name, parent)
+    never touches shared state. Fields holding child fields (nested
+    serializers, many-related fields) are deep-copied, the rest shallow.
+
+    Only use this on serializers whose fields do not depend on the instance,
+    context or request.
+    """
+
+    def get_fields(self):
+        cls = type(self)
+        cached = cls.__dict__.get('_cached_fields')
+        if cached is None:
+            cached = super().get_fields()
+            cls._cached_fields = cached
+        return {
+            name: (
+                copy.deepcopy(field)
+                if isinstance(field, (serializers.BaseSerializer, ManyRelatedField))
+                else copy.copy(field)
+            )
+            for name, field in cached.items()
+        }
+
+
 def safe_str(value):
     """Convert value to safe ASCII string (handle Unicode characters like Turkish İ)."""
     if value is None:
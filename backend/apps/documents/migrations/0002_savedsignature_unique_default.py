@@ -0,0 +1,36 @@
+"""
+Migration: enforce at most one default SavedSignature per user.
+
+Existing duplicates are cleared first (the newest default is kept) so
+the partial unique constraint can be created.
+"""
+from django.db import migrations, models
+
+
+def clear_duplicate_defaults(apps, schema_editor):
+    SavedSignature = apps.get_model('documents', 'SavedSignature')
+    seen_users = set()
+    for signature in SavedSignature.objects.filter(is_default=True).order_by('user_id', '-created_at'):
+        if signature.user_id in seen_users:
+            SavedSignature.objects.filter(pk=signature.pk).update(is_default=False)
+        else:
+            seen_users.add(signature.user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_defaults, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='savedsignature',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(is_default=True),
+                fields=['user'],
+                name='unique_default_signature_per_user',
+            ),
+        ),
+    ]
@@ -3,8 +3,9 @@ Models voor documenten en digitale handtekeningen.
 """
 import uuid
 import os
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 
 
 def document_upload_path(instance, filename):
@@ -52,18 +53,42 @@ class SavedSignature(models.Model):
         verbose_name = 'Opgeslagen handtekening'
         verbose_name_plural = 'Opgeslagen handtekeningen'
         ordering = ['-is_default', '-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                condition=models.Q(is_default=True),
+                fields=['user'],
+                name='unique_default_signature_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.user.full_name}"
 
     def save(self, *args, **kwargs):
-        # Zorg dat er maar één default is per gebruiker
+        # Zorg dat er maar één default is per gebruiker: eerst de andere
+        # uitzetten, anders botst de unique constraint
         if self.is_default:
-            SavedSignature.objects.filter(
-                user=self.user, 
-                is_default=True
-            ).exclude(pk=self.pk).update(is_default=False)
-        super().save(*args, **kwargs)
+            with transaction.atomic():
+                self._clear_other_defaults(timezone.now())
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+    def make_default(self):
+        """Maak deze handtekening de standaard van de gebruiker."""
+        now = timezone.now()
+        with transaction.atomic():
+            self._clear_other_defaults(now)
+            SavedSignature.objects.filter(pk=self.pk).update(is_default=True, updated_at=now)
+        self.is_default = True
+        self.updated_at = now
+
+    def _clear_other_defaults(self, now):
+        # update() slaat auto_now over, dus updated_at expliciet zetten
+        SavedSignature.objects.filter(
+            user_id=self.user_id,
+            is_default=True
+        ).exclude(pk=self.pk).update(is_default=False, updated_at=now)
 
 
 class SignedDocument(models.Model):
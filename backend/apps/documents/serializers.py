@@ -141,9 +141,14 @@ class DocumentUploadSerializer(serializers.Serializer):
 class SignDocumentSerializer(serializers.Serializer):
     """Serializer voor het ondertekenen van een document."""
     signature_image = serializers.CharField(
+        required=False,
         help_text='Base64 encoded PNG afbeelding van de handtekening',
         max_length=500000,  # ~375KB base64 = ~280KB image, ruim voldoende voor handtekening
     )
+    saved_signature_id = serializers.UUIDField(
+        required=False,
+        help_text='ID van een opgeslagen handtekening (in plaats van signature_image)'
+    )
     page = serializers.IntegerField(
         min_value=1,
         max_value=1000,  # Reasonable max page limit
@@ -186,6 +191,10 @@ class SignDocumentSerializer(serializers.Serializer):
         return value
     
     def validate(self, data):
+        if not data.get('signature_image') and not data.get('saved_signature_id'):
+            raise serializers.ValidationError({
+                'signature_image': 'Handtekening afbeelding of opgeslagen handtekening is verplicht.'
+            })
         if data.get('save_signature') and not data.get('signature_name'):
             raise serializers.ValidationError({
                 'signature_name': 'Naam is verplicht als je de handtekening wilt opslaan.'
@@ -5,7 +5,8 @@ import base64
 import io
 import logging
 from datetime import datetime
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import Tuple, Optional, Union
 
 from django.core.files.base import ContentFile
 from PIL import Image
@@ -19,23 +20,37 @@ def decode_base64_image(base64_string: str) -> Optional[bytes]:
     Ondersteunt zowel met als zonder data URI prefix.
     """
     try:
-        # Verwijder data URI prefix indien aanwezig
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
-        
-        return base64.b64decode(base64_string)
+        # Verwijder data URI prefix indien aanwezig en decodeer in één stap
+        return base64.b64decode(base64_string.split(',', 1)[-1], validate=False)
     except Exception as e:
         logger.error(f"Fout bij decoderen base64 afbeelding: {e}")
         return None
 
 
-def create_signature_image(signature_bytes: bytes, target_width: int = 200) -> Optional[bytes]:
+def create_signature_image(
+    signature_bytes: Union[bytes, memoryview],
+    target_width: int = 200
+) -> Optional[bytes]:
     """
     Maak een PNG afbeelding van de handtekening met transparante achtergrond.
+    
+    Identieke handtekeningen worden binnen het proces maar één keer
+    geschaald en gecodeerd.
     """
+    if isinstance(signature_bytes, memoryview):
+        signature_bytes = signature_bytes.tobytes()
+    return _render_signature_image(signature_bytes, target_width)
+
+
+@lru_cache(maxsize=16)
+def _render_signature_image(signature_bytes: bytes, target_width: int) -> Optional[bytes]:
     try:
         img = Image.open(io.BytesIO(signature_bytes))
         
+        # Al een (palette of RGBA) PNG op de juiste breedte: niets te doen
+        if img.format == 'PNG' and img.mode in ('RGBA', 'P') and img.width == target_width:
+            return signature_bytes
+        
         # Converteer naar RGBA voor transparantie
         if img.mode != 'RGBA':
             img = img.convert('RGBA')
@@ -45,9 +60,14 @@ def create_signature_image(signature_bytes: bytes, target_width: int = 200) -> O
         new_height = int(target_width * aspect_ratio)
         img = img.resize((target_width, new_height), Image.Resampling.LANCZOS)
         
+        # Een handtekening bevat weinig kleuren: reduceer naar een klein palet
+        # (met behoud van transparantie) voor een veel kleinere PNG, die ook
+        # in elke ondertekende PDF wordt ingesloten.
+        img = img.quantize(colors=16, method=Image.Quantize.FASTOCTREE)
+        
         # Sla op als PNG
         output = io.BytesIO()
-        img.save(output, format='PNG', optimize=True)
+        img.save(output, format='PNG', optimize=True, compress_level=9)
         return output.getvalue()
     except Exception as e:
         logger.error(f"Fout bij maken handtekening afbeelding: {e}")
@@ -132,9 +152,14 @@ def add_signature_to_pdf(
         return None, f"Fout bij ondertekenen: {str(e)}"
 
 
-def get_pdf_info(pdf_bytes: bytes) -> Optional[dict]:
+def get_pdf_info(pdf: Union[bytes, str]) -> Optional[dict]:
     """
     Haal informatie op over een PDF bestand.
+    
+    Args:
+        pdf: De PDF als bytes, of een pad naar het bestand. Bij een pad leest
+            PyMuPDF alleen de xref tabel en page tree in plaats van het hele
+            bestand in het geheugen te laden.
     """
     try:
         import fitz  # PyMuPDF
@@ -143,23 +168,18 @@ def get_pdf_info(pdf_bytes: bytes) -> Optional[dict]:
         return None
     
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        info = {
-            'page_count': len(doc),
-            'pages': []
-        }
-        
-        for i, page in enumerate(doc):
-            rect = page.rect
-            info['pages'].append({
-                'number': i + 1,
-                'width': rect.width,
-                'height': rect.height
-            })
-        
-        doc.close()
-        return info
+        if isinstance(pdf, str):
+            doc = fitz.open(pdf, filetype="pdf")
+        else:
+            doc = fitz.open(stream=pdf, filetype="pdf")
+        with doc:
+            return {
+                'page_count': doc.page_count,
+                'pages': [
+                    {'number': i + 1, 'width': page.rect.width, 'height': page.rect.height}
+                    for i, page in enumerate(doc)
+                ]
+            }
         
     except Exception as e:
         logger.error(f"Fout bij lezen PDF info: {e}")
@@ -185,23 +205,19 @@ def pdf_page_to_image(pdf_bytes: bytes, page_number: int, dpi: int = 150) -> Opt
         return None
     
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        if page_number < 1 or page_number > len(doc):
-            return None
-        
-        page = doc[page_number - 1]
-        
-        # Render pagina naar afbeelding
-        zoom = dpi / 72  # 72 is standaard PDF DPI
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Converteer naar PNG bytes
-        img_bytes = pix.tobytes("png")
-        
-        doc.close()
-        return img_bytes
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            if page_number < 1 or page_number > doc.page_count:
+                return None
+            
+            page = doc[page_number - 1]
+            
+            # Render pagina direct naar een in-memory pixmap (zonder alpha kanaal,
+            # een PDF pagina heeft altijd een dekkende achtergrond)
+            zoom = dpi / 72  # 72 is standaard PDF DPI
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            
+            # Converteer naar PNG bytes
+            return pix.tobytes("png")
         
     except Exception as e:
         logger.error(f"Fout bij converteren PDF pagina naar afbeelding: {e}")
@@ -0,0 +1,77 @@
+import smtplib
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from apps.documents import views
+
+KEY = views._smtp_pool_key('smtp.example.com', 587, 'user', 'secret', True)
+
+
+@patch('apps.documents.views.time.monotonic')
+@patch('apps.documents.views.get_connection')
+class SmtpPoolTests(TestCase):
+    def setUp(self):
+        views._smtp_pool.clear()
+
+    def tearDown(self):
+        views._smtp_pool.clear()
+
+    def test_reuses_open_connection(self, mock_get_connection, mock_monotonic):
+        mock_monotonic.side_effect = [100, 100, 130]
+
+        first = views._get_smtp_connection(KEY, 'secret')
+        second = views._get_smtp_connection(KEY, 'secret')
+
+        self.assertIs(first, second)
+        mock_get_connection.assert_called_once()
+        self.assertEqual(mock_get_connection.call_args.kwargs['timeout'], views._SMTP_TIMEOUT)
+        first.open.assert_called_once_with()
+
+    def test_replaces_connection_after_idle_timeout(self, mock_get_connection, mock_monotonic):
+        stale, fresh = Mock(), Mock()
+        mock_get_connection.side_effect = [stale, fresh]
+        mock_monotonic.side_effect = [100, 100, 100 + views._SMTP_MAX_IDLE + 1, 200]
+
+        views._get_smtp_connection(KEY, 'secret')
+        connection = views._get_smtp_connection(KEY, 'secret')
+
+        self.assertIs(connection, fresh)
+        stale.close.assert_called_once_with()
+        self.assertIs(views._smtp_pool[KEY][0], fresh)
+
+    def test_stale_connection_is_evicted_when_reconnect_fails(self, mock_get_connection, mock_monotonic):
+        stale, broken = Mock(), Mock()
+        broken.open.side_effect = OSError('timed out')
+        mock_get_connection.side_effect = [stale, broken]
+        mock_monotonic.side_effect = [100, 100, 100 + views._SMTP_MAX_IDLE + 1]
+
+        views._get_smtp_connection(KEY, 'secret')
+        with self.assertRaises(OSError):
+            views._get_smtp_connection(KEY, 'secret')
+
+        self.assertNotIn(KEY, views._smtp_pool)
+        stale.close.assert_called_once_with()
+
+    def test_retries_once_on_disconnect(self, mock_get_connection, mock_monotonic):
+        dropped, fresh = Mock(), Mock()
+        mock_get_connection.side_effect = [dropped, fresh]
+        mock_monotonic.return_value = 100
+        email = Mock()
+        email.send.side_effect = [smtplib.SMTPServerDisconnected('gone'), 1]
+
+        views._send_with_pooled_connection(email, KEY, 'secret')
+
+        self.assertEqual(email.send.call_count, 2)
+        self.assertIs(email.connection, fresh)
+        dropped.close.assert_called_once_with()
+        self.assertIs(views._smtp_pool[KEY][0], fresh)
+
+    def test_second_disconnect_is_raised(self, mock_get_connection, mock_monotonic):
+        mock_monotonic.return_value = 100
+        email = Mock()
+        email.send.side_effect = smtplib.SMTPServerDisconnected('gone')
+
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            views._send_with_pooled_connection(email, KEY, 'secret')
+
+        self.assertEqual(email.send.call_count, 2)
@@ -1,12 +1,21 @@
 """
 Views voor documenten en handtekeningen.
 """
+import atexit
+import hashlib
 import logging
-from datetime import datetime
+import os
+import re
+import smtplib
+import threading
+import time
 
 from django.db import models
 from django.http import HttpResponse, FileResponse
+from django.utils import timezone
 from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.mail import get_connection
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, throttle_classes
 from rest_framework.response import Response
@@ -33,6 +42,113 @@ from .services import (
 
 logger = logging.getLogger(__name__)
 
+# Per-process cache van open SMTP verbindingen, zodat niet voor elke e-mail
+# opnieuw een TCP + TLS + AUTH handshake nodig is.
+# key -> (verbinding, time.monotonic() van laatste gebruik)
+_smtp_pool = {}
+_smtp_pool_lock = threading.Lock()
+
+# Mailservers verbreken inactieve sessies na enkele minuten (Postfix na
+# 300 s); oudere verbindingen worden niet meer hergebruikt.
+_SMTP_MAX_IDLE = 60
+
+# Seconden voor connect, TLS en elk SMTP commando; EMAIL_TIMEOUT is niet gezet
+_SMTP_TIMEOUT = 30
+
+
+def _smtp_pool_key(host, port, username, password, use_tls) -> tuple:
+    password_hash = hashlib.sha256((password or '').encode()).hexdigest()
+    return (host, port, username or '', use_tls, password_hash)
+
+
+def _close_quietly(connection) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def _open_smtp_connection(key: tuple, password: str):
+    host, port, username, use_tls, _ = key
+    connection = get_connection(
+        backend='django.core.mail.backends.smtp.EmailBackend',
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        use_tls=use_tls,
+        timeout=_SMTP_TIMEOUT,
+        fail_silently=False,
+    )
+    connection.open()
+    return connection
+
+
+def _get_smtp_connection(key: tuple, password: str):
+    """Haal een open SMTP verbinding uit de pool of maak een nieuwe aan."""
+    now = time.monotonic()
+    with _smtp_pool_lock:
+        entry = _smtp_pool.get(key)
+        if entry is not None and now - entry[1] <= _SMTP_MAX_IDLE:
+            _smtp_pool[key] = (entry[0], now)
+            return entry[0]
+        if entry is not None:
+            # Te lang inactief: uit de pool, ook als het openen hieronder faalt
+            del _smtp_pool[key]
+    if entry is not None:
+        _close_quietly(entry[0])
+    
+    # Handshake (TCP, STARTTLS, AUTH) buiten de lock, zodat een trage server
+    # de e-mails naar andere servers niet ophoudt
+    connection = _open_smtp_connection(key, password)
+    with _smtp_pool_lock:
+        existing = _smtp_pool.get(key)
+        if existing is None:
+            _smtp_pool[key] = (connection, time.monotonic())
+            return connection
+    # Een andere thread was eerder; die verbinding gebruiken
+    _close_quietly(connection)
+    return existing[0]
+
+
+def _send_with_pooled_connection(email, key: tuple, password: str) -> None:
+    """Verstuur via de pool; een verbroken verbinding wordt eenmalig vervangen."""
+    try:
+        email.connection = _get_smtp_connection(key, password)
+        email.send()
+    except smtplib.SMTPServerDisconnected:
+        _evict_smtp_connection(key)
+        email.connection = _get_smtp_connection(key, password)
+        email.send()
+
+
+def _evict_smtp_connection(key: tuple) -> None:
+    """Verwijder een (verbroken) verbinding uit de pool."""
+    with _smtp_pool_lock:
+        entry = _smtp_pool.pop(key, None)
+    if entry is not None:
+        _close_quietly(entry[0])
+
+
+@atexit.register
+def _close_smtp_pool() -> None:
+    for key in list(_smtp_pool):
+        _evict_smtp_connection(key)
+
+
+_UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|\r\n]')
+
+
+def _sanitize_filename(filename: str) -> str:
+    """Sanitize filename to prevent header injection and path traversal."""
+    # Remove path components and replace dangerous characters
+    filename = _UNSAFE_FILENAME_RE.sub('_', os.path.basename(filename))
+    # Limit length
+    if len(filename) > 200:
+        name, ext = os.path.splitext(filename)
+        filename = name[:200-len(ext)] + ext
+    return filename or 'document.pdf'
+
 
 class SignedDocumentViewSet(viewsets.ModelViewSet):
     """
@@ -44,15 +160,20 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter to only show documents the user has access to."""
         user = self.request.user
+        queryset = SignedDocument.objects.select_related('uploaded_by', 'signed_by')
+        if self.action == 'list':
+            # Lijstweergave heeft geen signature_data of bestandspaden nodig
+            queryset = queryset.only(
+                'id', 'title', 'description', 'original_filename', 'status',
+                'uploaded_by', 'signed_by', 'created_at', 'signed_at',
+                'uploaded_by__voornaam', 'uploaded_by__achternaam', 'uploaded_by__email',
+                'signed_by__voornaam', 'signed_by__achternaam', 'signed_by__email',
+            )
         # Admin users can see all documents
         if user.is_superuser or user.rol == 'admin':
-            return SignedDocument.objects.select_related(
-                'uploaded_by', 'signed_by'
-            ).all()
+            return queryset.all()
         # Regular users can only see their own uploaded documents
-        return SignedDocument.objects.select_related(
-            'uploaded_by', 'signed_by'
-        ).filter(
+        return queryset.filter(
             models.Q(uploaded_by=user) | models.Q(signed_by=user)
         )
     
@@ -100,10 +221,11 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        pdf_bytes = document.original_file.read()
-        document.original_file.seek(0)
-        
-        info = get_pdf_info(pdf_bytes)
+        if isinstance(document.original_file.storage, FileSystemStorage):
+            info = get_pdf_info(document.original_file.path)
+        else:
+            with document.original_file.open('rb') as f:
+                info = get_pdf_info(f.read())
         if not info:
             return Response(
                 {'error': 'Kon PDF informatie niet lezen'},
@@ -175,18 +297,33 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         
-        # Decode handtekening afbeelding
-        signature_bytes = decode_base64_image(data['signature_image'])
-        if not signature_bytes:
-            return Response(
-                {'error': 'Ongeldige handtekening afbeelding'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Maak nette PNG van handtekening
-        signature_png = create_signature_image(signature_bytes, target_width=300)
-        if not signature_png:
-            signature_png = signature_bytes
+        saved_signature_id = data.get('saved_signature_id')
+        if saved_signature_id:
+            # Opgeslagen handtekening is al als PNG gerenderd
+            try:
+                saved_signature = SavedSignature.objects.get(
+                    id=saved_signature_id, user=request.user
+                )
+            except SavedSignature.DoesNotExist:
+                return Response(
+                    {'error': 'Opgeslagen handtekening niet gevonden'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            with saved_signature.signature_image.open('rb') as f:
+                signature_png = f.read()
+        else:
+            # Decode handtekening afbeelding
+            signature_bytes = decode_base64_image(data['signature_image'])
+            if not signature_bytes:
+                return Response(
+                    {'error': 'Ongeldige handtekening afbeelding'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Maak nette PNG van handtekening
+            signature_png = create_signature_image(signature_bytes, target_width=300)
+            if not signature_png:
+                signature_png = signature_bytes
         
         # Lees originele PDF
         pdf_bytes = document.original_file.read()
@@ -217,21 +354,24 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
         )
         
         # Update document
+        now = timezone.now()
         document.status = 'signed'
         document.signed_by = request.user
-        document.signed_at = datetime.now()
+        document.signed_at = now
         document.signature_data = {
             'page': data['page'],
             'x': data['x'],
             'y': data['y'],
             'width': data.get('width', 20),
-            'signed_at': document.signed_at.isoformat(),
+            'signed_at': now.isoformat(),
             'signed_by': request.user.full_name or request.user.email
         }
-        document.save()
+        document.save(update_fields=[
+            'signed_file', 'status', 'signed_by', 'signed_at', 'signature_data', 'updated_at'
+        ])
         
         # Optioneel: sla handtekening op voor hergebruik
-        if data.get('save_signature'):
+        if data.get('save_signature') and not saved_signature_id:
             SavedSignature.objects.create(
                 user=request.user,
                 name=data.get('signature_name', 'Mijn handtekening'),
@@ -245,19 +385,27 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
             SignedDocumentDetailSerializer(document, context={'request': request}).data
         )
     
-    def _sanitize_filename(self, filename: str) -> str:
-        """Sanitize filename to prevent header injection and path traversal."""
-        import re
-        import os
-        # Remove path components
-        filename = os.path.basename(filename)
-        # Remove or replace dangerous characters
-        filename = re.sub(r'[\\/:*?"<>|\r\n]', '_', filename)
-        # Limit length
-        if len(filename) > 200:
-            name, ext = os.path.splitext(filename)
-            filename = name[:200-len(ext)] + ext
-        return filename or 'document.pdf'
+    def _file_response(self, field_file, filename: str) -> FileResponse:
+        """
+        Bouw een FileResponse voor een opgeslagen bestand.
+        
+        Bij lokale opslag wordt het bestand direct via het pad geopend zodat
+        de WSGI server wsgi.file_wrapper/sendfile kan gebruiken.
+        """
+        if isinstance(field_file.storage, FileSystemStorage):
+            f = open(field_file.path, 'rb')
+            size = os.fstat(f.fileno()).st_size
+        else:
+            f = field_file.open('rb')
+            size = field_file.size
+        response = FileResponse(
+            f,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/pdf'
+        )
+        response['Content-Length'] = size
+        return response
     
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
@@ -272,13 +420,8 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        safe_filename = self._sanitize_filename(document.original_filename)
-        response = FileResponse(
-            document.signed_file.open('rb'),
-            content_type='application/pdf'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{safe_filename}"'
-        return response
+        safe_filename = _sanitize_filename(document.original_filename)
+        return self._file_response(document.signed_file, safe_filename)
     
     @action(detail=True, methods=['get'])
     def download_original(self, request, pk=None):
@@ -287,13 +430,8 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
         """
         document = self.get_object()
         
-        safe_filename = self._sanitize_filename(document.original_filename)
-        response = FileResponse(
-            document.original_file.open('rb'),
-            content_type='application/pdf'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{safe_filename}"'
-        return response
+        safe_filename = _sanitize_filename(document.original_filename)
+        return self._file_response(document.original_file, safe_filename)
     
     @action(detail=True, methods=['post'])
     @throttle_classes([DocumentEmailRateThrottle])
@@ -301,7 +439,7 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
         """
         Verstuur het ondertekende document via e-mail.
         """
-        from django.core.mail import EmailMessage, get_connection
+        from django.core.mail import EmailMessage
         from apps.core.models import AppSettings
         
         document = self.get_object()
@@ -333,6 +471,9 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Bedrijfsgegevens voor de afsluiting van de e-mail
+        settings = AppSettings.get_settings()
+
         # Build subject
         subject = data.get('subject') or f'Ondertekend document: {document.title}'
 
@@ -356,17 +497,6 @@ Met vriendelijke groet,
 """
         
         try:
-            # Create custom SMTP connection
-            connection = get_connection(
-                backend='django.core.mail.backends.smtp.EmailBackend',
-                host=smtp_host,
-                port=smtp_port,
-                username=smtp_username_raw or '',
-                password=smtp_password,
-                use_tls=smtp_use_tls,
-                fail_silently=False,
-            )
-
             from_email = _from_email
             
             email = EmailMessage(
@@ -374,16 +504,24 @@ Met vriendelijke groet,
                 body=body,
                 from_email=from_email,
                 to=[recipient_email],
-                connection=connection,
             )
             
-            # Attach the signed PDF
-            document.signed_file.seek(0)
-            pdf_content = document.signed_file.read()
-            filename = f"ondertekend_{document.original_filename}"
+            # Attach the signed PDF (lokaal direct via het pad, zonder FieldFile wrapper)
+            if isinstance(document.signed_file.storage, FileSystemStorage):
+                with open(document.signed_file.path, 'rb') as f:
+                    pdf_content = f.read()
+            else:
+                with document.signed_file.open('rb') as f:
+                    pdf_content = f.read()
+            filename = _sanitize_filename(f"ondertekend_{document.original_filename}")
             email.attach(filename, pdf_content, 'application/pdf')
             
-            email.send()
+            # Hergebruik de SMTP verbinding; bij een verbroken verbinding
+            # wordt deze eenmalig opnieuw opgezet.
+            smtp_key = _smtp_pool_key(
+                smtp_host, smtp_port, smtp_username_raw, smtp_password, smtp_use_tls
+            )
+            _send_with_pooled_connection(email, smtp_key, smtp_password)
             
             logger.info(
                 f"Signed document email sent: {document.title} to {recipient_email} "
@@ -411,7 +549,12 @@ class SavedSignatureViewSet(viewsets.ModelViewSet):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     
     def get_queryset(self):
-        return SavedSignature.objects.filter(user=self.request.user)
+        queryset = SavedSignature.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = queryset.only(
+                'id', 'name', 'signature_image', 'is_default', 'created_at', 'updated_at'
+            )
+        return queryset
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -420,6 +563,5 @@ class SavedSignatureViewSet(viewsets.ModelViewSet):
     def set_default(self, request, pk=None):
         """Stel deze handtekening in als standaard."""
         signature = self.get_object()
-        signature.is_default = True
-        signature.save()
+        signature.make_default()
         return Response(SavedSignatureSerializer(signature).data)
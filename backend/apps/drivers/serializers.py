@@ -1,9 +1,29 @@
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
 from rest_framework import serializers
 from .models import Driver
 
+# Weergavenaam van de gekoppelde gebruiker, in de database berekend
+# (volledige naam, met gebruikersnaam als fallback).
+GEKOPPELDE_GEBRUIKER_NAAM = Case(
+    When(gekoppelde_gebruiker__isnull=True, then=Value(None)),
+    default=Coalesce(
+        NullIf(
+            Trim(Concat(
+                'gekoppelde_gebruiker__voornaam', Value(' '), 'gekoppelde_gebruiker__achternaam'
+            )),
+            Value(''),
+        ),
+        'gekoppelde_gebruiker__username',
+    ),
+    output_field=CharField(),
+)
+
+
 class DriverSerializer(serializers.ModelSerializer):
     bedrijf_naam = serializers.CharField(source='bedrijf.naam', read_only=True, allow_null=True)
-    gekoppelde_gebruiker_naam = serializers.SerializerMethodField()
+    # Geannoteerd via GEKOPPELDE_GEBRUIKER_NAAM op de queryset
+    gekoppelde_gebruiker_naam = serializers.CharField(read_only=True, allow_null=True)
     voertuig_ritnummer = serializers.CharField(source='voertuig.ritnummer', read_only=True, allow_null=True)
     voertuig_kenteken = serializers.CharField(source='voertuig.kenteken', read_only=True, allow_null=True)
     
@@ -20,7 +40,11 @@ class DriverSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
-    def get_gekoppelde_gebruiker_naam(self, obj):
-        if obj.gekoppelde_gebruiker:
-            return obj.gekoppelde_gebruiker.full_name or obj.gekoppelde_gebruiker.username
-        return None
+    def save(self, **kwargs):
+        # Na create/update is de annotatie niet (meer) actueel
+        instance = super().save(**kwargs)
+        user = instance.gekoppelde_gebruiker
+        instance.gekoppelde_gebruiker_naam = (
+            (user.full_name.strip() or user.username) if user else None
+        )
+        return instance
@@ -1,9 +1,13 @@
+import json
 import logging
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from apps.core.permissions import IsAdminOrManager, HasModulePermission
 from .models import Driver
-from .serializers import DriverSerializer
+from .serializers import DriverSerializer, GEKOPPELDE_GEBRUIKER_NAAM
 
 logger = logging.getLogger('accounts.security')
 
@@ -14,7 +18,9 @@ class DriverViewSet(viewsets.ModelViewSet):
     - Admin/Gebruiker: Full CRUD access
     - Chauffeur: Read-only access
     """
-    queryset = Driver.objects.select_related('bedrijf', 'gekoppelde_gebruiker', 'voertuig').all()
+    queryset = Driver.objects.select_related(
+        'bedrijf', 'voertuig'
+    ).annotate(gekoppelde_gebruiker_naam=GEKOPPELDE_GEBRUIKER_NAAM)
     serializer_class = DriverSerializer
     permission_classes = [IsAuthenticated, IsAdminOrManager, HasModulePermission]
     module_permission = 'view_drivers'
@@ -23,6 +29,39 @@ class DriverViewSet(viewsets.ModelViewSet):
     ordering_fields = ['naam', 'created_at']
     ordering = ['naam']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'export'):
+            # Van gerelateerde rijen zijn alleen de weergavevelden nodig
+            queryset = queryset.only(
+                'id', 'naam', 'telefoon', 'bedrijf', 'gekoppelde_gebruiker', 'voertuig',
+                'adr', 'minimum_uren_per_week', 'standaard_pauze', 'auto_uren',
+                'tacho_kenteken', 'standaard_begintijd', 'uren_per_dag',
+                'created_at', 'updated_at',
+                'bedrijf__naam',
+                'voertuig__ritnummer', 'voertuig__kenteken',
+            )
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporteer alle (gefilterde) chauffeurs als JSON array zonder paginering.
+        Rijen worden in blokken uit de database gestreamd.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        
+        def rows():
+            yield '['
+            for i, driver in enumerate(queryset.iterator(chunk_size=500)):
+                if i:
+                    yield ','
+                yield json.dumps(serializer.to_representation(driver), cls=DjangoJSONEncoder)
+            yield ']'
+        
+        return StreamingHttpResponse(rows(), content_type='application/json')
+    
     def perform_create(self, serializer):
         driver = serializer.save()
         logger.info(
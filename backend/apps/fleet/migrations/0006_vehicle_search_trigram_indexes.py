@@ -0,0 +1,40 @@
+"""
+Trigram indexes for the vehicle search (PostgreSQL only).
+
+DRF SearchFilter searches with icontains, which PostgreSQL runs as
+UPPER(column) LIKE UPPER('%...%'); a GIN trigram index on UPPER(column)
+serves that. Other databases (SQLite in local settings) are skipped, so the
+indexes are not part of the model state.
+"""
+from django.db import migrations
+
+SEARCH_COLUMNS = ['kenteken', 'ritnummer', 'type_wagen']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS vehicle_{column}_trgm '
+            f'ON fleet_vehicle USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS vehicle_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0005_remove_old_kenteken_unique_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+def fill_bedrijf_naam_cache(apps, schema_editor):
+    Vehicle = apps.get_model('fleet', 'Vehicle')
+    Company = apps.get_model('companies', 'Company')
+    Vehicle.objects.update(
+        bedrijf_naam_cache=models.Subquery(
+            Company.objects.filter(pk=models.OuterRef('bedrijf_id')).values('naam')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('fleet', '0006_vehicle_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='bedrijf_naam_cache',
+            field=models.CharField(
+                blank=True, default='', editable=False, max_length=200,
+                verbose_name='Bedrijfsnaam',
+            ),
+        ),
+        migrations.RunPython(fill_bedrijf_naam_cache, migrations.RunPython.noop),
+    ]
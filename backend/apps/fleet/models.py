@@ -3,6 +3,23 @@ import uuid
 from django.db import models
 
 
+class VehicleQuerySet(models.QuerySet):
+    """QuerySet voor voertuigen."""
+    
+    # Kolommen die lijsten en VehicleSerializer lezen
+    LIST_FIELDS = (
+        'id', 'kenteken', 'type_wagen', 'ritnummer', 'bedrijf', 'bedrijf_naam_cache',
+        'minimum_weken_per_jaar', 'actief', 'created_at', 'updated_at',
+    )
+    
+    def for_list(self):
+        """Alleen de kolommen voor lijsten; de bedrijfsnaam komt uit bedrijf_naam_cache."""
+        return self.only(*self.LIST_FIELDS)
+    
+    def actief(self):
+        return self.filter(actief=True)
+
+
 class Vehicle(models.Model):
     """Voertuig model."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -15,6 +32,12 @@ class Vehicle(models.Model):
         related_name='vehicles',
         verbose_name='Bedrijf'
     )
+    # Kopie van bedrijf.naam zodat lijsten geen JOIN op bedrijven nodig hebben.
+    # Bijgehouden in save() en door companies.signals bij een naamswijziging.
+    bedrijf_naam_cache = models.CharField(
+        max_length=200, blank=True, default='', editable=False,
+        verbose_name='Bedrijfsnaam'
+    )
     
     minimum_weken_per_jaar = models.PositiveIntegerField(
         null=True, blank=True,
@@ -30,6 +53,8 @@ class Vehicle(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = VehicleQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Voertuig'
         verbose_name_plural = 'Voertuigen'
@@ -41,6 +66,16 @@ class Vehicle(models.Model):
                 name='unique_kenteken_actief'
             )
         ]
+        # De trigram indexen voor de zoekfunctie staan alleen in migratie
+        # 0006 (PostgreSQL); SQLite kent ze niet
     
     def __str__(self):
         return f"{self.kenteken} - {self.type_wagen}"
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'bedrijf' in update_fields:
+            self.bedrijf_naam_cache = self.bedrijf.naam if self.bedrijf_id else ''
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'bedrijf_naam_cache'}
+        super().save(*args, **kwargs)
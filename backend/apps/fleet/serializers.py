@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from apps.core.serializers import CachedFieldsMixin
 from .models import Vehicle
 
-class VehicleSerializer(serializers.ModelSerializer):
-    bedrijf_naam = serializers.CharField(source='bedrijf.naam', read_only=True, allow_null=True)
+class VehicleSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    bedrijf_naam = serializers.CharField(source='bedrijf_naam_cache', read_only=True)
     
     class Meta:
         model = Vehicle
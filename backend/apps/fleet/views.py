@@ -1,16 +1,30 @@
+import hashlib
 import logging
 from datetime import date
-from rest_framework import viewsets, status
+from django.core.cache import cache
+from django.db.models import Count, F, Max
+from django.http import HttpResponse
+import orjson
+from rest_framework import serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q
+from rest_framework.renderers import BrowsableAPIRenderer
 from apps.core.permissions import FleetPermission
+from apps.core.renderers import OrjsonRenderer
 from .models import Vehicle
 from .serializers import VehicleSerializer
 
 logger = logging.getLogger('accounts.security')
 
+# Zelfde datum/tijd opmaak als VehicleSerializer voor de .values() lijst
+_datetime_field = serializers.DateTimeField()
+
+# Elke wijziging geeft een nieuwe cache key, dus oude entries worden niet meer
+# gelezen. De korte TTL ruimt ze snel op en begrenst hoe lang een
+# QuerySet.update() zonder updated_at een verouderde lijst kan tonen.
+VEHICLE_LIST_CACHE_TTL = 60
+
 
 class VehicleViewSet(viewsets.ModelViewSet):
     """
@@ -18,30 +32,88 @@ class VehicleViewSet(viewsets.ModelViewSet):
     - Admin/Gebruiker: Full CRUD access
     - Chauffeur: Read-only access
     """
-    queryset = Vehicle.objects.select_related('bedrijf').all()
+    queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     permission_classes = [IsAuthenticated, FleetPermission]
+    renderer_classes = [OrjsonRenderer, BrowsableAPIRenderer]
     search_fields = ['kenteken', 'ritnummer', 'type_wagen']
     filterset_fields = ['bedrijf', 'type_wagen']
     ordering_fields = ['kenteken', 'type_wagen', 'created_at']
     ordering = ['kenteken']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.for_list()
+        return queryset
+    
+    def _list_cache_key(self, request):
+        """
+        Cache key op basis van de volledige URL (filters, zoeken, sortering,
+        pagina) en de laatste wijziging in de voertuigentabel. Een create of
+        update verhoogt max(updated_at), een delete verlaagt het aantal.
+        """
+        state = Vehicle.objects.aggregate(
+            last_updated=Max('updated_at'), total=Count('id')
+        )
+        raw = f"{request.build_absolute_uri()}|{state['last_updated']}|{state['total']}"
+        return f"fleet:vehicle_list_json:{hashlib.sha256(raw.encode()).hexdigest()}"
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Lijst als dict-rijen via .values() in plaats van model instanties en
+        VehicleSerializer; de uitvoer heeft dezelfde velden en opmaak.
+        Het resultaat wordt als gerenderde JSON bytes kort gecached zolang de
+        tabel niet wijzigt; een JSON request krijgt die bytes ongewijzigd terug.
+        """
+        cache_key = self._list_cache_key(request)
+        body = cache.get(cache_key)
+        if body is None:
+            body = OrjsonRenderer().render(self._list_data())
+            cache.set(cache_key, body, VEHICLE_LIST_CACHE_TTL)
+        if isinstance(request.accepted_renderer, OrjsonRenderer):
+            return HttpResponse(body, content_type=OrjsonRenderer.media_type)
+        return Response(orjson.loads(body))
+    
+    def _list_data(self):
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            'id', 'kenteken', 'type_wagen', 'ritnummer', 'bedrijf',
+            'minimum_weken_per_jaar', 'actief', 'created_at', 'updated_at',
+            bedrijf_naam=F('bedrijf_naam_cache'),
+        )
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        for row in rows:
+            row['created_at'] = _datetime_field.to_representation(row['created_at'])
+            row['updated_at'] = _datetime_field.to_representation(row['updated_at'])
+        if page is not None:
+            return self.get_paginated_response(rows).data
+        return rows
+    
+    def _log_vehicle_event(self, level, event, vehicle):
+        """Security log entry; same message as before plus structured fields."""
+        user_email = self.request.user.email
+        logger.log(
+            level, "Vehicle %s: %s (ID: %s) by %s",
+            event, vehicle.kenteken, vehicle.id, user_email,
+            extra={
+                'event': f'vehicle.{event}',
+                'kenteken': vehicle.kenteken,
+                'vehicle_id': str(vehicle.id),
+                'user': user_email,
+            },
+        )
+    
     def perform_create(self, serializer):
         vehicle = serializer.save()
-        logger.info(
-            f"Vehicle created: {vehicle.kenteken} (ID: {vehicle.id}) by {self.request.user.email}"
-        )
+        self._log_vehicle_event(logging.INFO, 'created', vehicle)
     
     def perform_update(self, serializer):
         vehicle = serializer.save()
-        logger.info(
-            f"Vehicle updated: {vehicle.kenteken} (ID: {vehicle.id}) by {self.request.user.email}"
-        )
+        self._log_vehicle_event(logging.INFO, 'updated', vehicle)
     
     def perform_destroy(self, instance):
-        logger.warning(
-            f"Vehicle deleted: {instance.kenteken} (ID: {instance.id}) by {self.request.user.email}"
-        )
+        self._log_vehicle_event(logging.WARNING, 'deleted', instance)
         instance.delete()
 
     @action(detail=False, methods=['get'], url_path='dropdown')
@@ -51,7 +123,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
         Accessible by all authenticated users (including chauffeurs)
         so they can select a vehicle when registering hours.
         """
-        vehicles = Vehicle.objects.filter(actief=True).select_related('bedrijf').order_by('kenteken')
+        vehicles = Vehicle.objects.actief().for_list().order_by('kenteken')
         serializer = self.get_serializer(vehicles, many=True)
         return Response(serializer.data)
 
@@ -67,7 +139,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
         jaar = int(request.query_params.get('jaar', date.today().year))
         
         # Get vehicles that have minimum weeks configured
-        vehicles = Vehicle.objects.select_related('bedrijf').filter(
+        vehicles = Vehicle.objects.filter(
             minimum_weken_per_jaar__isnull=False
         ).order_by('kenteken')
         
@@ -91,7 +163,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
                 'kenteken': vehicle.kenteken,
                 'type_wagen': vehicle.type_wagen,
                 'ritnummer': vehicle.ritnummer,
-                'bedrijf_naam': vehicle.bedrijf.naam if vehicle.bedrijf else '',
+                'bedrijf_naam': vehicle.bedrijf_naam_cache,
                 'minimum_weken': minimum_weken,
                 'minimum_dagen': minimum_dagen,
                 'gewerkte_dagen': worked_days,
@@ -16,6 +16,7 @@ class InvoiceTemplateAdmin(admin.ModelAdmin):
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
     list_display = ['factuurnummer', 'bedrijf', 'type', 'status', 'factuurdatum', 'totaal']
+    list_select_related = ['bedrijf']
     list_filter = ['type', 'status', 'factuurdatum']
     search_fields = ['factuurnummer', 'bedrijf__naam']
     date_hierarchy = 'factuurdatum'
@@ -25,3 +26,4 @@ class InvoiceAdmin(admin.ModelAdmin):
 @admin.register(InvoiceLine)
 class InvoiceLineAdmin(admin.ModelAdmin):
     list_display = ['invoice', 'omschrijving', 'aantal', 'prijs_per_eenheid', 'totaal']
+    list_select_related = ['invoice']
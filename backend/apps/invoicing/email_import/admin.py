@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import MailboxConfig, EmailImport, EmailAttachment
 
 
@@ -12,12 +13,22 @@ class MailboxConfigAdmin(admin.ModelAdmin):
                       'total_emails_processed', 'total_invoices_imported',
                       'created_at', 'updated_at']
     
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match and (resolver_match.url_name or '').endswith('_changelist'):
+            # The changelist shows no (encrypted) credentials or long text fields
+            qs = qs.defer(
+                '_username', '_password', '_ms365_client_secret', 'description', 'last_error'
+            )
+        return qs
+    
     fieldsets = (
         ('Basis', {
             'fields': ('id', 'name', 'description', 'email_address', 'protocol', 'status')
         }),
         ('IMAP Instellingen', {
-            'fields': ('imap_server', 'imap_port', 'imap_use_ssl'),
+            'fields': ('imap_server', 'imap_port', 'imap_use_ssl', 'imap_fetch_batch_size'),
             'classes': ('collapse',)
         }),
         ('Microsoft 365 Instellingen', {
@@ -51,15 +62,20 @@ class EmailImportAdmin(admin.ModelAdmin):
     search_fields = ['email_subject', 'email_from', 'email_message_id']
     readonly_fields = ['id', 'email_message_id', 'created_at', 'updated_at']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_attachment_count=Count('attachments'))
+    
     def attachment_count(self, obj):
-        return obj.attachments.count()
+        return obj._attachment_count
     attachment_count.short_description = 'Bijlages'
+    attachment_count.admin_order_field = '_attachment_count'
 
 
 @admin.register(EmailAttachment)
 class EmailAttachmentAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'email_import', 'file_size', 
                     'is_processed', 'created_at']
+    list_select_related = ['email_import']
     list_filter = ['is_processed', 'content_type']
     search_fields = ['original_filename']
     readonly_fields = ['id', 'created_at']
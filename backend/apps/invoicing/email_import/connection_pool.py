@@ -0,0 +1,91 @@
+"""
+IMAP Connection Pool
+
+Keeps logged-in IMAP sessions between fetches so scheduled and manual
+fetches of the same mailbox skip the TLS handshake and LOGIN.
+"""
+import imaplib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def logout_quietly(connection: imaplib.IMAP4):
+    """LOGOUT without raising; the session may already be gone."""
+    try:
+        connection.logout()
+    except Exception:
+        pass
+
+
+class ImapPool:
+    """
+    Process-wide cache of logged-in IMAP connections, one per mailbox login.
+
+    A connection is checked out by acquire() and handed back by release();
+    it is never shared by two readers at the same time.
+    """
+
+    def __init__(self, max_idle: float = 25 * 60, max_size: int = 20):
+        # Servers may drop idle sessions after 30 minutes (RFC 3501 autologout)
+        self.max_idle = max_idle
+        self.max_size = max_size
+        # key -> (connection, time.monotonic() of last release)
+        self._conns: Dict[tuple, Tuple[imaplib.IMAP4, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: tuple, connect: Callable[[], imaplib.IMAP4]) -> imaplib.IMAP4:
+        """
+        Live connection for key: the pooled one when it still answers NOOP,
+        otherwise a new one from connect().
+        """
+        connection = self._checkout(key)
+        if connection is not None:
+            try:
+                connection.noop()
+                return connection
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                logger.info(f"Pooled IMAP connection is gone, reconnecting: {e}")
+                logout_quietly(connection)
+        return connect()
+
+    def release(self, key: tuple, connection: imaplib.IMAP4):
+        """Return a connection to the pool without LOGOUT."""
+        with self._lock:
+            previous = self._conns.pop(key, None)
+            self._conns[key] = (connection, time.monotonic())
+            # Dicts keep insertion order, so the first entries are the least recently used
+            evicted = [
+                self._conns.pop(pool_key)[0]
+                for pool_key in list(self._conns)[:max(0, len(self._conns) - self.max_size)]
+            ]
+
+        if previous and previous[0] is not connection:
+            evicted.append(previous[0])
+        for stale in evicted:
+            logout_quietly(stale)
+
+    def discard(self, connection: imaplib.IMAP4):
+        """Drop a connection that may be broken instead of returning it."""
+        logout_quietly(connection)
+
+    def _checkout(self, key: tuple) -> Optional[imaplib.IMAP4]:
+        """Take the pooled connection for key, if any; logs out idle ones."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                pool_key for pool_key, (_, last_used) in self._conns.items()
+                if now - last_used > self.max_idle
+            ]
+            stale = [self._conns.pop(pool_key)[0] for pool_key in expired]
+            entry = self._conns.pop(key, None)
+
+        for connection in stale:
+            logout_quietly(connection)
+        return entry[0] if entry else None
+
+
+imap_pool = ImapPool()
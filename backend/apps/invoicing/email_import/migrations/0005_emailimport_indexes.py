@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_import', '0004_add_default_invoice_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailimport',
+            index=models.Index(fields=['mailbox_config', 'status', '-created_at'], name='ei_mbx_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='emailimport',
+            index=models.Index(fields=['mailbox_config', '-email_date'], name='ei_mbx_emaildate'),
+        ),
+    ]
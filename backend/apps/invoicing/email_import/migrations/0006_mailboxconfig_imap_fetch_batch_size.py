@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_import', '0005_emailimport_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailboxconfig',
+            name='imap_fetch_batch_size',
+            field=models.PositiveIntegerField(default=100, help_text='Berichten per UID FETCH; verlagen bij "maximum request size exceeded"', verbose_name='IMAP Batchgrootte'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_import', '0006_mailboxconfig_imap_fetch_batch_size'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailimport',
+            index=models.Index(fields=['status', '-created_at'], name='ei_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='emailimport',
+            index=models.Index(fields=['status', '-email_date'], name='ei_status_emaildate'),
+        ),
+    ]
@@ -3,14 +3,22 @@ Email Import Models
 
 Models for managing shared mailbox configurations and tracking imported emails.
 """
+import logging
 import uuid
-from django.db import models
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+from django.db import models, transaction
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile, File
 from cryptography.fernet import Fernet
 import base64
 import os
 
+logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
 def get_encryption_key():
     """Get or generate encryption key for credentials."""
     key = getattr(settings, 'EMAIL_IMPORT_ENCRYPTION_KEY', None)
@@ -24,6 +32,12 @@ def get_encryption_key():
     return key
 
 
+@lru_cache(maxsize=1)
+def _get_fernet() -> Fernet:
+    """Fernet instance for the credential key, built once per process."""
+    return Fernet(get_encryption_key())
+
+
 class MailboxConfig(models.Model):
     """
     Configuration for a shared mailbox to monitor for invoices.
@@ -75,6 +89,11 @@ class MailboxConfig(models.Model):
         default=True, 
         verbose_name='SSL Gebruiken'
     )
+    imap_fetch_batch_size = models.PositiveIntegerField(
+        default=100,
+        verbose_name='IMAP Batchgrootte',
+        help_text='Berichten per UID FETCH; verlagen bij "maximum request size exceeded"'
+    )
     
     # Email address (the shared mailbox address)
     email_address = models.EmailField(verbose_name='E-mail Adres (Shared Mailbox)')
@@ -219,16 +238,14 @@ class MailboxConfig(models.Model):
         """Encrypt a value using Fernet."""
         if not value:
             return ''
-        f = Fernet(get_encryption_key())
-        return f.encrypt(value.encode()).decode()
+        return _get_fernet().encrypt(value.encode()).decode()
     
     def _decrypt(self, encrypted_value: str) -> str:
         """Decrypt a value using Fernet."""
         if not encrypted_value:
             return ''
         try:
-            f = Fernet(get_encryption_key())
-            return f.decrypt(encrypted_value.encode()).decode()
+            return _get_fernet().decrypt(encrypted_value.encode()).decode()
         except Exception:
             return ''
     
@@ -255,6 +272,54 @@ class MailboxConfig(models.Model):
     @ms365_client_secret.setter
     def ms365_client_secret(self, value: str):
         self._ms365_client_secret = self._encrypt(value)
+    
+    @property
+    def has_credentials(self) -> bool:
+        """Whether IMAP credentials are stored (without decrypting them)."""
+        return bool(self._username or self._password)
+    
+    @property
+    def has_ms365_secret(self) -> bool:
+        return bool(self._ms365_client_secret)
+
+
+class EmailImportQuerySet(models.QuerySet):
+    """QuerySet with maintenance helpers for email imports."""
+    
+    # Number of attachment file names handed to one cleanup task
+    PURGE_FILE_BATCH_SIZE = 1000
+    
+    def bulk_purge(self, mailbox_config_id, before) -> int:
+        """
+        Delete all imports of a mailbox created before `before`, plus their
+        attachments, with one DELETE per table.
+        
+        Bypasses the cascade collector, so no delete signals are sent.
+        Attachment files are removed after commit by a Celery task.
+        Returns the number of deleted imports.
+        """
+        from .tasks import delete_email_attachment_files
+        
+        imports = self.filter(mailbox_config_id=mailbox_config_id, created_at__lt=before)
+        attachments = EmailAttachment.objects.filter(email_import__in=imports.values('pk'))
+        
+        with transaction.atomic(using=self.db):
+            file_names = [
+                name for name in attachments.values_list('file', flat=True).iterator()
+                if name
+            ]
+            attachments._raw_delete(attachments.db)
+            deleted = imports._raw_delete(imports.db)
+            EmailImport.invalidate_cached_listings()
+            
+            for i in range(0, len(file_names), self.PURGE_FILE_BATCH_SIZE):
+                batch = file_names[i:i + self.PURGE_FILE_BATCH_SIZE]
+                transaction.on_commit(
+                    lambda batch=batch: delete_email_attachment_files.delay(batch),
+                    using=self.db,
+                )
+        
+        return deleted
 
 
 class EmailImport(models.Model):
@@ -320,15 +385,79 @@ class EmailImport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EmailImportQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'E-mail Import'
         verbose_name_plural = 'E-mail Imports'
         ordering = ['-created_at']
         # Prevent duplicate imports of the same email
         unique_together = ['mailbox_config', 'email_message_id']
+        indexes = [
+            models.Index(fields=['mailbox_config', 'status', '-created_at'], name='ei_mbx_status_created'),
+            models.Index(fields=['mailbox_config', '-email_date'], name='ei_mbx_emaildate'),
+            # Listings across all mailboxes: pending_review and ?status=
+            models.Index(fields=['status', '-created_at'], name='ei_status_created'),
+            models.Index(fields=['status', '-email_date'], name='ei_status_emaildate'),
+        ]
     
     def __str__(self):
-        return f"{self.email_subject} ({self.get_status_display()})"
+        return f"{self.email_subject} ({_STATUS_DISPLAY.get(self.status, self.status)})"
+    
+    # Part of the cache keys of the polled pending_review and statistics
+    # responses; bumped whenever imports are added, reviewed or deleted
+    CACHE_VERSION_KEY = 'email_import:cache_version'
+    
+    @classmethod
+    def cache_version(cls) -> int:
+        return cache.get_or_set(cls.CACHE_VERSION_KEY, 1, None)
+    
+    @classmethod
+    def invalidate_cached_listings(cls):
+        """Move the cached listings to new keys once the change is committed."""
+        def bump():
+            try:
+                cache.incr(cls.CACHE_VERSION_KEY)
+            except ValueError:
+                # Evicted; readers start again from 1 and the old entries expire
+                cache.add(cls.CACHE_VERSION_KEY, 1, None)
+        transaction.on_commit(bump)
+    
+    @classmethod
+    def create_bulk(cls, mailbox_config, instances: Iterable['EmailImport']) -> Dict[str, 'EmailImport']:
+        """
+        Insert unsaved imports for a mailbox in one multi-row INSERT.
+        
+        `instances` are for messages the caller already found not imported;
+        there is no second lookup here. Messages a concurrent fetch inserted
+        meanwhile are skipped through the (mailbox_config, email_message_id)
+        unique constraint. Returns a dict of message id to import for the
+        rows this call created.
+        """
+        instances = list(instances)
+        for instance in instances:
+            instance.mailbox_config = mailbox_config
+        cls.objects.bulk_create(instances, batch_size=200, ignore_conflicts=True)
+        
+        # Only rows carrying our primary key were created by this call
+        stored = dict(
+            cls.objects.filter(
+                mailbox_config=mailbox_config,
+                email_message_id__in=[instance.email_message_id for instance in instances],
+            ).values_list('email_message_id', 'pk')
+        )
+        return {
+            instance.email_message_id: instance
+            for instance in instances
+            if stored.get(instance.email_message_id) == instance.pk
+        }
+
+
+# get_status_display() rebuilds the choices dict on every call
+_STATUS_DISPLAY = dict(EmailImport.Status.choices)
+
+# Storage writes release the GIL, so a few threads overlap the PDF saves
+_FILE_WRITE_WORKERS = 4
 
 
 class EmailAttachment(models.Model):
@@ -378,3 +507,80 @@ class EmailAttachment(models.Model):
     
     def __str__(self):
         return self.original_filename
+    
+    @classmethod
+    def delete_files(cls, file_names: Iterable[str]):
+        """
+        Remove stored files whose rows were rolled back; storage writes are
+        not part of the database transaction.
+        """
+        storage = cls._meta.get_field('file').storage
+        for name in file_names:
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.warning(f"Could not delete attachment file {name}: {e}")
+    
+    @classmethod
+    def bulk_create_for_imports(cls, items: Iterable[Tuple['EmailImport', Dict]]) -> List['EmailAttachment']:
+        """
+        Create attachments for several imports with one INSERT and one UPDATE.
+        
+        `items` are (email_import, part) pairs, parts being attachment dicts
+        as returned by the email readers (`filename`, already sanitized,
+        `content`, `content_type` and `size`). Rows are inserted without a
+        file; the files are then written to storage and their names stored
+        with a single bulk_update. A part's `content` may also be a binary
+        file object (e.g. a spooled download), which is copied in chunks
+        and closed. Several files are written in parallel by a small thread
+        pool; when any write fails, the files already written are deleted
+        before the error is raised.
+        """
+        items = list(items)
+        instances = [
+            cls(
+                email_import=email_import,
+                original_filename=part['filename'],
+                content_type=part['content_type'],
+                file_size=part['size'],
+            )
+            for email_import, part in items
+        ]
+        cls.objects.bulk_create(instances, batch_size=200)
+        
+        file_field = cls._meta.get_field('file')
+        
+        def save_file(pair):
+            instance, (_email_import, part) = pair
+            name = file_field.generate_filename(instance, part['filename'])
+            content = part['content']
+            if isinstance(content, bytes):
+                instance.file.name = file_field.storage.save(
+                    name, ContentFile(content), max_length=file_field.max_length
+                )
+                return
+            
+            with content:
+                instance.file.name = file_field.storage.save(
+                    name, File(content), max_length=file_field.max_length
+                )
+        
+        pairs = list(zip(instances, items))
+        try:
+            if len(pairs) > 1:
+                # Storage picks a free name itself, so parallel saves can't clash
+                with ThreadPoolExecutor(max_workers=_FILE_WRITE_WORKERS) as executor:
+                    futures = [executor.submit(save_file, pair) for pair in pairs]
+                # All writes have finished here; re-raise the first failure
+                for future in futures:
+                    future.result()
+            else:
+                for pair in pairs:
+                    save_file(pair)
+            cls.objects.bulk_update(instances, ['file'], batch_size=200)
+        except Exception:
+            # The caller's rollback drops the rows but not the files written
+            cls.delete_files(instance.file.name for instance in instances if instance.file.name)
+            raise
+        
+        return instances
@@ -3,47 +3,145 @@ Email Import Serializers
 
 Serializers for the email import API.
 """
+import re
+import uuid
+from typing import Optional
+from django.db.models import OuterRef, Prefetch, Subquery
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from apps.core.serializers import CachedFieldsMixin
+from apps.invoicing.ocr.models import InvoiceImport
 from .models import MailboxConfig, EmailImport, EmailAttachment
 
 
-class MailboxConfigSerializer(serializers.ModelSerializer):
+# Same date/time output as a serializer DateTimeField, for the plain-dict path
+_datetime_field = serializers.DateTimeField()
+
+_EMAIL_RE = re.compile(r'^[^@]+@[^@]+\.[^@]+$')
+
+# Output key -> keys to try in the OCR result (English first, then Dutch)
+_FIELD_MAP = (
+    ('invoice_number', ('invoice_number', 'factuurnummer')),
+    ('invoice_date', ('invoice_date', 'factuurdatum')),
+    ('due_date', ('due_date', 'vervaldatum')),
+    ('supplier_name', ('supplier_name', 'leverancier')),
+    ('supplier_address', ('supplier_address', 'adres')),
+    ('supplier_vat', ('vat_number', 'btw_nummer')),
+    ('supplier_kvk', ('kvk_number', 'kvk')),
+    ('supplier_iban', ('iban',)),
+    ('total_amount', ('total_amount', 'totaal')),
+    ('vat_amount', ('vat_amount', 'btw_bedrag')),
+    ('net_amount', ('net_amount', 'netto')),
+)
+
+# Line item output key -> keys to try (Dutch first, then English), default
+_LINE_MAP = (
+    ('description', ('omschrijving', 'description'), ''),
+    ('quantity', ('aantal', 'quantity'), None),
+    ('unit_price', ('prijs_per_eenheid', 'unit_price'), None),
+    ('total', ('totaal', 'total'), None),
+    ('vat_rate', ('btw_percentage', 'vat_rate'), None),
+)
+
+
+# Choice labels for MailboxConfig, built once instead of via get_FOO_display()
+_PROTOCOL_DISPLAY = dict(MailboxConfig._meta.get_field('protocol').flatchoices)
+_MAILBOX_STATUS_DISPLAY = dict(MailboxConfig._meta.get_field('status').flatchoices)
+_INVOICE_TYPE_DISPLAY = dict(MailboxConfig._meta.get_field('default_invoice_type').flatchoices)
+_INVOICE_IMPORT_STATUS_DISPLAY = dict(InvoiceImport._meta.get_field('status').flatchoices)
+
+
+# Write-only credential fields, encrypted by the MailboxConfig property setters
+_CREDENTIAL_KEYS = ('username', 'password', 'ms365_client_secret')
+
+
+def _pop_credentials(validated_data: dict) -> dict:
+    """Remove all credential keys from validated_data; return the non-empty ones."""
+    credentials = {
+        key: validated_data.pop(key) for key in _CREDENTIAL_KEYS if key in validated_data
+    }
+    return {key: value for key, value in credentials.items() if value}
+
+
+def _display_name(user) -> str:
+    """Full name of a user, falling back to the email address."""
+    if not user:
+        return ''
+    name = (getattr(user, 'full_name', '') or '').strip()
+    return name or user.email
+
+
+def _absolute_file_url(field_file, request) -> str:
+    """
+    Absolute URL of a stored file. The scheme+host prefix is computed once
+    per request instead of parsing it again for every attachment.
+    """
+    if not field_file or request is None:
+        return ''
+    url = field_file.url
+    if url.startswith('/') and not url.startswith('//'):
+        base = getattr(request, '_absolute_base_url', None)
+        if base is None:
+            base = request.build_absolute_uri('/')[:-1]
+            request._absolute_base_url = base
+        return base + url
+    return request.build_absolute_uri(url)
+
+
+def _first_value(mapping: dict, keys: tuple, default=None):
+    """Same result as `mapping.get(k1) or ... or mapping.get(kn, default)`."""
+    for key in keys[:-1]:
+        value = mapping.get(key)
+        if value:
+            return value
+    return mapping.get(keys[-1], default)
+
+
+class MailboxConfigSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Serializer for mailbox configuration list view."""
     
     created_by_name = serializers.SerializerMethodField()
-    protocol_display = serializers.CharField(source='get_protocol_display', read_only=True)
-    status_display = serializers.CharField(source='get_status_display', read_only=True)
-    default_invoice_type_display = serializers.CharField(source='get_default_invoice_type_display', read_only=True)
+    protocol_display = serializers.SerializerMethodField()
+    status_display = serializers.SerializerMethodField()
+    default_invoice_type_display = serializers.SerializerMethodField()
     
     class Meta:
         model = MailboxConfig
-        fields = [
+        fields = (
             'id', 'name', 'description', 'protocol', 'protocol_display',
             'status', 'status_display', 'email_address', 'folder_name',
             'folder_display_name', 'default_invoice_type', 'default_invoice_type_display',
             'auto_fetch_enabled', 'auto_fetch_interval_minutes',
             'last_fetch_at', 'total_emails_processed', 'total_invoices_imported',
             'created_by_name', 'created_at', 'updated_at'
-        ]
-        read_only_fields = ['id', 'status', 'last_fetch_at', 'total_emails_processed',
-                          'total_invoices_imported', 'created_at', 'updated_at']
+        )
+        read_only_fields = ('id', 'status', 'last_fetch_at', 'total_emails_processed',
+                          'total_invoices_imported', 'created_at', 'updated_at')
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Load the relations read by the mailbox serializers."""
+        return queryset.select_related('created_by')
     
     def get_created_by_name(self, obj) -> str:
-        if obj.created_by:
-            name = getattr(obj.created_by, 'full_name', '') or ''
-            name = name.strip()
-            if name:
-                return name
-            return obj.created_by.email
-        return ''
+        return _display_name(obj.created_by)
+    
+    def get_protocol_display(self, obj) -> str:
+        return _PROTOCOL_DISPLAY.get(obj.protocol, obj.protocol)
+    
+    def get_status_display(self, obj) -> str:
+        return _MAILBOX_STATUS_DISPLAY.get(obj.status, obj.status)
+    
+    def get_default_invoice_type_display(self, obj) -> str:
+        return _INVOICE_TYPE_DISPLAY.get(obj.default_invoice_type, obj.default_invoice_type)
 
 
-class MailboxConfigDetailSerializer(serializers.ModelSerializer):
+class MailboxConfigDetailSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Detailed serializer for mailbox configuration."""
     
     created_by_name = serializers.SerializerMethodField()
-    protocol_display = serializers.CharField(source='get_protocol_display', read_only=True)
-    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    protocol_display = serializers.SerializerMethodField()
+    status_display = serializers.SerializerMethodField()
     
     # Write-only fields for credentials (never expose in responses)
     username = serializers.CharField(write_only=True, required=False, allow_blank=True)
@@ -51,15 +149,15 @@ class MailboxConfigDetailSerializer(serializers.ModelSerializer):
     ms365_client_secret = serializers.CharField(write_only=True, required=False, allow_blank=True)
     
     # Indicators for whether credentials are set
-    has_credentials = serializers.SerializerMethodField()
-    has_ms365_secret = serializers.SerializerMethodField()
+    has_credentials = serializers.BooleanField(read_only=True)
+    has_ms365_secret = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = MailboxConfig
-        fields = [
+        fields = (
             'id', 'name', 'description', 'protocol', 'protocol_display',
             'status', 'status_display', 'email_address',
-            'imap_server', 'imap_port', 'imap_use_ssl',
+            'imap_server', 'imap_port', 'imap_use_ssl', 'imap_fetch_batch_size',
             'username', 'password', 'has_credentials',
             'ms365_client_id', 'ms365_client_secret', 'ms365_tenant_id', 'has_ms365_secret',
             'folder_name', 'folder_display_name', 'mark_as_read', 
@@ -69,25 +167,24 @@ class MailboxConfigDetailSerializer(serializers.ModelSerializer):
             'auto_fetch_enabled', 'auto_fetch_interval_minutes',
             'last_fetch_at', 'last_error', 'total_emails_processed', 'total_invoices_imported',
             'created_by_name', 'created_at', 'updated_at'
-        ]
-        read_only_fields = ['id', 'status', 'last_fetch_at', 'last_error',
+        )
+        read_only_fields = ('id', 'status', 'last_fetch_at', 'last_error',
                           'total_emails_processed', 'total_invoices_imported',
-                          'created_at', 'updated_at']
+                          'created_at', 'updated_at')
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Load the relations read by the mailbox serializers."""
+        return queryset.select_related('created_by')
     
     def get_created_by_name(self, obj) -> str:
-        if obj.created_by:
-            name = getattr(obj.created_by, 'full_name', '') or ''
-            name = name.strip()
-            if name:
-                return name
-            return obj.created_by.email
-        return ''
+        return _display_name(obj.created_by)
     
-    def get_has_credentials(self, obj) -> bool:
-        return bool(obj._username or obj._password)
+    def get_protocol_display(self, obj) -> str:
+        return _PROTOCOL_DISPLAY.get(obj.protocol, obj.protocol)
     
-    def get_has_ms365_secret(self, obj) -> bool:
-        return bool(obj._ms365_client_secret)
+    def get_status_display(self, obj) -> str:
+        return _MAILBOX_STATUS_DISPLAY.get(obj.status, obj.status)
     
     def validate_imap_port(self, value):
         """Validate IMAP port is in valid range."""
@@ -95,6 +192,12 @@ class MailboxConfigDetailSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Poort moet tussen 1 en 65535 zijn")
         return value
     
+    def validate_imap_fetch_batch_size(self, value):
+        """Validate the FETCH batch size stays within server request limits."""
+        if value < 1 or value > 1000:
+            raise serializers.ValidationError("Batchgrootte moet tussen 1 en 1000 zijn")
+        return value
+    
     def validate_auto_fetch_interval_minutes(self, value):
         """Validate fetch interval is reasonable."""
         if value < 5:
@@ -105,8 +208,7 @@ class MailboxConfigDetailSerializer(serializers.ModelSerializer):
     
     def validate_email_address(self, value):
         """Basic email validation."""
-        import re
-        if not re.match(r'^[^@]+@[^@]+\.[^@]+$', value):
+        if not _EMAIL_RE.match(value):
             raise serializers.ValidationError("Ongeldig e-mail adres")
         return value.lower()
     
@@ -135,161 +237,218 @@ class MailboxConfigDetailSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """Handle credential encryption on create."""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"CREATE validated_data keys: {validated_data.keys()}")
-        logger.info(f"CREATE ms365_client_secret present: {'ms365_client_secret' in validated_data}")
-        
-        username = validated_data.pop('username', '')
-        password = validated_data.pop('password', '')
-        ms365_secret = validated_data.pop('ms365_client_secret', '')
-        
-        logger.info(f"CREATE ms365_secret value (truncated): {ms365_secret[:10] if ms365_secret else 'EMPTY'}...")
+        credentials = _pop_credentials(validated_data)
         
         instance = MailboxConfig(**validated_data)
         
-        if username:
-            instance.username = username
-        if password:
-            instance.password = password
-        if ms365_secret:
-            instance.ms365_client_secret = ms365_secret
+        for attr, value in credentials.items():
+            setattr(instance, attr, value)
         
         instance.save()
         return instance
     
     def update(self, instance, validated_data):
         """Handle credential encryption on update."""
-        username = validated_data.pop('username', None)
-        password = validated_data.pop('password', None)
-        ms365_secret = validated_data.pop('ms365_client_secret', None)
+        credentials = _pop_credentials(validated_data)
         
         # Update regular fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
         # Update credentials only if provided (non-empty)
-        if username:
-            instance.username = username
-        if password:
-            instance.password = password
-        if ms365_secret:
-            instance.ms365_client_secret = ms365_secret
+        for attr, value in credentials.items():
+            setattr(instance, attr, value)
         
         instance.save()
         return instance
 
 
-class EmailAttachmentSerializer(serializers.ModelSerializer):
+class EmailAttachmentSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Serializer for email attachments."""
     
     file_url = serializers.SerializerMethodField()
     invoice_import_id = serializers.UUIDField(source='invoice_import.id', read_only=True, allow_null=True)
-    invoice_import_status = serializers.CharField(
-        source='invoice_import.get_status_display', 
-        read_only=True, 
-        allow_null=True
-    )
+    invoice_import_status = serializers.SerializerMethodField()
     extracted_data = serializers.SerializerMethodField()
     
     class Meta:
         model = EmailAttachment
-        fields = [
+        fields = (
             'id', 'original_filename', 'file_url', 'file_size', 'content_type',
             'invoice_import_id', 'invoice_import_status', 'is_processed',
             'error_message', 'created_at', 'extracted_data'
-        ]
+        )
     
     def get_file_url(self, obj) -> str:
-        request = self.context.get('request')
-        if obj.file and request:
-            return request.build_absolute_uri(obj.file.url)
-        return ''
+        return _absolute_file_url(obj.file, self.context.get('request'))
+    
+    def get_invoice_import_status(self, obj) -> Optional[str]:
+        return _invoice_import_status(obj)
     
     def get_extracted_data(self, obj) -> dict:
         """Return extracted invoice data from linked InvoiceImport."""
-        if obj.invoice_import and obj.invoice_import.extracted_data:
-            data = obj.invoice_import.extracted_data
-            fields = data.get('fields', {})
-            line_items = data.get('line_items', [])
-            
-            # Map the fields to a frontend-friendly format
-            return {
-                'invoice_number': fields.get('invoice_number') or fields.get('factuurnummer'),
-                'invoice_date': fields.get('invoice_date') or fields.get('factuurdatum'),
-                'due_date': fields.get('due_date') or fields.get('vervaldatum'),
-                'supplier_name': fields.get('supplier_name') or fields.get('leverancier'),
-                'supplier_address': fields.get('supplier_address') or fields.get('adres'),
-                'supplier_vat': fields.get('vat_number') or fields.get('btw_nummer'),
-                'supplier_kvk': fields.get('kvk_number') or fields.get('kvk'),
-                'supplier_iban': fields.get('iban'),
-                'total_amount': fields.get('total_amount') or fields.get('totaal'),
-                'vat_amount': fields.get('vat_amount') or fields.get('btw_bedrag'),
-                'net_amount': fields.get('net_amount') or fields.get('netto'),
-                'currency': fields.get('currency', 'EUR'),
-                'line_items': [
-                    {
-                        'description': item.get('omschrijving') or item.get('description', ''),
-                        'quantity': item.get('aantal') or item.get('quantity'),
-                        'unit_price': item.get('prijs_per_eenheid') or item.get('unit_price'),
-                        'total': item.get('totaal') or item.get('total'),
-                        'vat_rate': item.get('btw_percentage') or item.get('vat_rate'),
-                    }
-                    for item in line_items
-                ] if line_items else []
-            }
-        return {}
-
-
-class EmailImportSerializer(serializers.ModelSerializer):
+        if not self.context.get('include_extracted', True):
+            return {}
+        return _extracted_data(obj.invoice_import)
+
+
+def _invoice_import_status(attachment) -> Optional[str]:
+    """Status label of the linked InvoiceImport, None when not linked."""
+    if not attachment.invoice_import_id:
+        return None
+    status = attachment.invoice_import.status
+    return _INVOICE_IMPORT_STATUS_DISPLAY.get(status, status)
+
+
+def include_extracted(request) -> bool:
+    """Whether the caller asked for extracted_data in a list (?include=extracted)."""
+    if request is None:
+        return False
+    return 'extracted' in request.query_params.get('include', '').split(',')
+
+
+def _extracted_data(invoice_import) -> dict:
+    """Map the OCR result of an InvoiceImport to a frontend-friendly format."""
+    if invoice_import and invoice_import.extracted_data:
+        data = invoice_import.extracted_data
+        fields = data.get('fields', {})
+        line_items = data.get('line_items', [])
+        
+        result = {out_key: _first_value(fields, keys) for out_key, keys in _FIELD_MAP}
+        result['currency'] = fields.get('currency', 'EUR')
+        result['line_items'] = [
+            {out_key: _first_value(item, keys, default) for out_key, keys, default in _LINE_MAP}
+            for item in line_items
+        ] if line_items else []
+        return result
+    return {}
+
+
+# Attachment columns read by serialize_email_attachment (and the FK the
+# prefetch joins on)
+_ATTACHMENT_FIELDS = (
+    'id', 'email_import', 'original_filename', 'file', 'file_size', 'content_type',
+    'invoice_import', 'is_processed', 'error_message', 'created_at',
+)
+
+
+def serialize_email_attachment(obj, request=None, with_extracted=True) -> dict:
+    """
+    Plain-dict equivalent of EmailAttachmentSerializer, for attachments
+    nested in list responses. Skips DRF's per-field binding and
+    get_attribute overhead; the serializer stays for the API schema.
+    extracted_data is {} unless with_extracted is set.
+    """
+    invoice_import = obj.invoice_import
+    return {
+        'id': str(obj.id),
+        'original_filename': obj.original_filename,
+        'file_url': _absolute_file_url(obj.file, request),
+        'file_size': obj.file_size,
+        'content_type': obj.content_type,
+        'invoice_import_id': str(invoice_import.id) if invoice_import else None,
+        'invoice_import_status': _invoice_import_status(obj),
+        'is_processed': obj.is_processed,
+        'error_message': obj.error_message,
+        'created_at': _datetime_field.to_representation(obj.created_at),
+        'extracted_data': _extracted_data(invoice_import) if with_extracted else {},
+    }
+
+
+class EmailImportSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Serializer for email import list view."""
     
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     mailbox_name = serializers.CharField(source='mailbox_config.name', read_only=True)
     default_invoice_type = serializers.CharField(source='mailbox_config.default_invoice_type', read_only=True)
-    attachment_count = serializers.SerializerMethodField()
+    attachment_count = serializers.IntegerField(read_only=True)  # annotated by the views
     reviewed_by_name = serializers.SerializerMethodField()
-    attachments = EmailAttachmentSerializer(many=True, read_only=True)
+    attachments = serializers.SerializerMethodField()
     first_invoice_import_id = serializers.SerializerMethodField()
     
     class Meta:
         model = EmailImport
-        fields = [
+        fields = (
             'id', 'mailbox_name', 'default_invoice_type', 'email_subject', 'email_from', 'email_date',
             'email_body_preview', 'status', 'status_display', 'attachment_count',
             'processed_at', 'reviewed_by_name', 'reviewed_at',
             'created_at', 'updated_at', 'attachments', 'first_invoice_import_id'
-        ]
+        )
     
-    def get_attachment_count(self, obj) -> int:
-        return obj.attachments.count()
+    @classmethod
+    def setup_eager_loading(cls, queryset, include_extracted=True):
+        """
+        Load every relation this serializer (and the detail variant) reads.
+        Without include_extracted the OCR JSON column is left out of the
+        prefetch; context['include_extracted'] must then be False as well.
+        """
+        # Only the columns serialize_email_attachment reads; the joined
+        # InvoiceImport would otherwise bring its full OCR text along
+        invoice_import_fields = ['invoice_import__status']
+        if include_extracted:
+            invoice_import_fields.append('invoice_import__extracted_data')
+        attachments = EmailAttachment.objects.select_related('invoice_import').only(
+            *_ATTACHMENT_FIELDS, *invoice_import_fields
+        )
+        return queryset.select_related(
+            'mailbox_config', 'reviewed_by'
+        ).prefetch_related(
+            Prefetch('attachments', queryset=attachments)
+        )
+    
+    @extend_schema_field(EmailAttachmentSerializer(many=True))
+    def get_attachments(self, obj):
+        request = self.context.get('request')
+        with_extracted = self.context.get('include_extracted', True)
+        return [
+            serialize_email_attachment(attachment, request, with_extracted)
+            for attachment in obj.attachments.all()
+        ]
     
     def get_reviewed_by_name(self, obj) -> str:
-        if obj.reviewed_by:
-            name = getattr(obj.reviewed_by, 'full_name', '') or ''
-            name = name.strip()
-            if name:
-                return name
-            return obj.reviewed_by.email
-        return ''
+        return _display_name(obj.reviewed_by)
     
-    def get_first_invoice_import_id(self, obj) -> str:
+    def get_first_invoice_import_id(self, obj) -> Optional[uuid.UUID]:
         """Return the ID of the first attachment's invoice import."""
-        first_attachment = obj.attachments.filter(invoice_import__isnull=False).first()
-        if first_attachment and first_attachment.invoice_import:
-            return str(first_attachment.invoice_import.id)
+        # Scan the prefetched attachments (same ordering) instead of querying;
+        # the JSON renderer stringifies the UUID
+        for attachment in obj.attachments.all():
+            if attachment.invoice_import_id:
+                return attachment.invoice_import_id
         return None
 
 
+class EmailImportSummarySerializer(EmailImportSerializer):
+    """
+    List serializer without the nested attachments, for callers that only
+    need attachment_count and first_invoice_import_id (?attachments=false).
+    """
+    
+    first_invoice_import_id = serializers.UUIDField(read_only=True, allow_null=True)
+    
+    class Meta(EmailImportSerializer.Meta):
+        fields = tuple(f for f in EmailImportSerializer.Meta.fields if f != 'attachments')
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset, include_extracted=True):
+        """No attachment rows needed: the first invoice import id is a subquery."""
+        first_invoice_import = EmailAttachment.objects.filter(
+            email_import=OuterRef('pk'), invoice_import__isnull=False
+        ).order_by('original_filename').values('invoice_import_id')[:1]
+        return queryset.select_related(
+            'mailbox_config', 'reviewed_by'
+        ).annotate(first_invoice_import_id=Subquery(first_invoice_import))
+
+
 class EmailImportDetailSerializer(EmailImportSerializer):
     """Detailed serializer for email import."""
     
     attachments = EmailAttachmentSerializer(many=True, read_only=True)
     
     class Meta(EmailImportSerializer.Meta):
-        fields = EmailImportSerializer.Meta.fields + [
-            'attachments', 'error_message', 'review_notes'
-        ]
+        fields = EmailImportSerializer.Meta.fields + (
+            'error_message', 'review_notes'
+        )
 
 
 class EmailImportReviewSerializer(serializers.Serializer):
@@ -305,10 +464,30 @@ class EmailImportReviewSerializer(serializers.Serializer):
     )
 
 
+class UUIDListField(serializers.ListField):
+    """
+    ListField of UUID strings, parsed in one pass instead of running the
+    full child-field validation for every item. The child stays declared
+    for the API schema.
+    """
+    
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        if not self.allow_empty and not data:
+            self.fail('empty')
+        if self.max_length is not None and len(data) > self.max_length:
+            self.fail('max_length', max_length=self.max_length)
+        try:
+            return [uuid.UUID(hex=value) for value in data]
+        except (TypeError, ValueError, AttributeError):
+            raise serializers.ValidationError('Ongeldige UUID in de lijst')
+
+
 class BulkDeleteSerializer(serializers.Serializer):
     """Serializer for bulk deleting email imports."""
     
-    ids = serializers.ListField(
+    ids = UUIDListField(
         child=serializers.UUIDField(),
         min_length=1,
         max_length=100,
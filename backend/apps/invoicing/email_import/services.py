@@ -5,20 +5,276 @@ Services for reading emails from shared mailboxes and processing PDF attachments
 """
 import imaplib
 import email
+import functools
+import itertools
 from email.header import decode_header
+from email.utils import parsedate_to_datetime
 import logging
 import re
+import tempfile
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files import File
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from apps.invoicing.ocr.services import InvoiceImportService
+from .connection_pool import imap_pool, logout_quietly
+from .models import EmailAttachment, EmailImport, MailboxConfig
 
 logger = logging.getLogger(__name__)
 
+# Default UIDs per IMAP UID FETCH command (MailboxConfig.imap_fetch_batch_size);
+# larger sets risk a "maximum request size exceeded" BAD response on some servers
+_IMAP_FETCH_BATCH_SIZE = 100
+
+# Parallel OCR workers per fetch; each runs its own tesseract subprocess
+_OCR_MAX_WORKERS = 4
+
+# Attachments waiting for or in OCR; keeps the fetch at most this far ahead
+_OCR_MAX_PENDING = 32
+
+# Graph attachment downloads are streamed in chunks of this size; files up
+# to _ATTACHMENT_SPOOL_SIZE stay in memory, larger ones spill to a temp file
+_ATTACHMENT_CHUNK_SIZE = 64 * 1024
+_ATTACHMENT_SPOOL_SIZE = 1024 * 1024
+
+# Case-insensitive *.pdf file name, without lowercasing a copy first
+_PDF_EXT_RE = re.compile(r'\.pdf\Z', re.IGNORECASE)
+
+# Characters dropped from attachment file names
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w\s\-\.]')
+
+# Result set in an untagged ESEARCH response: (TAG "A5") ALL 1:3,5
+_ESEARCH_ALL_RE = re.compile(rb'\bALL ([0-9:,]+)')
+
+# Start of a per-message line in a FETCH response: b'<num> (...'
+_FETCH_LINE_RE = re.compile(rb'^(\d+) \(')
+
+# UID item of a FETCH response; sent before or after the requested items
+_FETCH_UID_RE = re.compile(rb'\bUID (\d+)')
+
+# BODYSTRUCTURE hints that a message may carry a PDF: an application/pdf or
+# octet-stream part, a *.pdf name, or an encoded name we cannot check here
+_PDF_STRUCTURE_RE = re.compile(rb'"application" "(?:pdf|octet-stream)"|\.pdf\b|=\?', re.IGNORECASE)
+
+# Same hints per BODYSTRUCTURE leaf, once the structure has been parsed
+_PDF_PART_TYPES = {(b'application', b'pdf'), (b'application', b'octet-stream')}
+_PDF_PART_HINT_RE = re.compile(rb'\.pdf\b|=\?', re.IGNORECASE)
+
+# Quoted string or atom inside a parenthesized IMAP response
+_IMAP_QUOTED_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"')
+_IMAP_ATOM_RE = re.compile(rb'[^\s()"{]+')
+
+
+def _read_list_token(line: str, pos: int) -> Tuple[Optional[str], int]:
+    """Read a quoted string, NIL or atom starting at pos; return (value, end)."""
+    if line.startswith('"', pos):
+        chars = []
+        pos += 1
+        while pos < len(line) and line[pos] != '"':
+            if line[pos] == '\\' and pos + 1 < len(line):
+                pos += 1
+            chars.append(line[pos])
+            pos += 1
+        return ''.join(chars), pos + 1
+    
+    end = line.find(' ', pos)
+    if end < 0:
+        end = len(line)
+    atom = line[pos:end]
+    return (None if atom.upper() == 'NIL' else atom), end
+
+
+def _parse_list_line(line: str) -> Optional[Tuple[str, Optional[str], str]]:
+    """
+    Split an IMAP LIST response line, (\\Flags) "delimiter" "folder_name",
+    into (flags, delimiter, name) in one left-to-right pass. Handles
+    escaped quotes, NIL delimiters and unquoted names.
+    """
+    if not line.startswith('('):
+        return None
+    flags_end = line.find(')')
+    if flags_end < 0:
+        return None
+    
+    pos = flags_end + 1
+    values = []
+    for _ in range(2):
+        while line.startswith(' ', pos):
+            pos += 1
+        if pos >= len(line):
+            return None
+        value, pos = _read_list_token(line, pos)
+        values.append(value)
+    
+    delimiter, name = values
+    if name is None:
+        return None
+    return line[1:flags_end], delimiter, name
+
+
+def _parse_imap_list(data: bytes, pos: int) -> list:
+    """
+    Parse the parenthesized list starting at data[pos] into nested lists of
+    bytes, with None for NIL. Literals are expected inline after their
+    {size} marker, as in a joined imaplib response tuple.
+    """
+    stack = []
+    while pos < len(data):
+        char = data[pos:pos + 1]
+        if char == b'(':
+            stack.append([])
+            pos += 1
+            continue
+        if char == b')':
+            done = stack.pop()
+            if not stack:
+                return done
+            stack[-1].append(done)
+            pos += 1
+            continue
+        if char.isspace():
+            pos += 1
+            continue
+        
+        if char == b'"':
+            match = _IMAP_QUOTED_RE.match(data, pos)
+            if not match:
+                raise ValueError('unterminated quoted string')
+            value = re.sub(rb'\\(.)', rb'\1', match.group(1))
+            pos = match.end()
+        elif char == b'{':
+            close = data.index(b'}', pos)
+            start = close + 1
+            pos = start + int(data[pos + 1:close])
+            value = data[start:pos]
+        else:
+            match = _IMAP_ATOM_RE.match(data, pos)
+            if not match:
+                raise ValueError(f'unexpected {char!r} at {pos}')
+            value = None if match.group().upper() == b'NIL' else match.group()
+            pos = match.end()
+        
+        if not stack:
+            raise ValueError('value outside of a list')
+        stack[-1].append(value)
+    
+    raise ValueError('unterminated list')
+
+
+def _iter_structure_strings(node: list) -> Iterator[bytes]:
+    for item in node:
+        if isinstance(item, list):
+            yield from _iter_structure_strings(item)
+        elif item is not None:
+            yield item
+
+
+def _pdf_part_numbers(structure: list, number: str = '') -> Optional[List[str]]:
+    """
+    IMAP part numbers ('2', '2.1') of the BODYSTRUCTURE leaves that may be a
+    PDF attachment. None when the structure cannot be mapped onto the parsed
+    message, i.e. it encapsulates another message.
+    """
+    if structure and isinstance(structure[0], list):
+        # Multipart: the child parts come first, then the subtype
+        numbers = []
+        children = itertools.takewhile(lambda child: isinstance(child, list), structure)
+        for index, child in enumerate(children, 1):
+            child_numbers = _pdf_part_numbers(child, f'{number}.{index}' if number else str(index))
+            if child_numbers is None:
+                return None
+            numbers.extend(child_numbers)
+        return numbers
+    
+    if len(structure) < 2 or not all(isinstance(value, bytes) for value in structure[:2]):
+        raise ValueError('malformed body structure')
+    media_type = (structure[0].lower(), structure[1].lower())
+    if media_type == (b'message', b'rfc822'):
+        return None
+    
+    if media_type in _PDF_PART_TYPES or any(
+        _PDF_PART_HINT_RE.search(value) for value in _iter_structure_strings(structure)
+    ):
+        return [number or '1']
+    return []
+
+
+def _part_by_number(msg, number: str):
+    """Navigate a parsed message to an IMAP part number without walk()."""
+    if not msg.is_multipart():
+        if number != '1':
+            raise ValueError(f'no part {number} in a single-part message')
+        return msg
+    
+    part = msg
+    for index in number.split('.'):
+        if not part.is_multipart():
+            raise ValueError(f'part {number} does not match the message')
+        part = part.get_payload()[int(index) - 1]
+    return part
+
+
+def _tail_of_sequence_set(sequence_set: bytes, limit: int) -> List[bytes]:
+    """Last `limit` numbers of an IMAP sequence set like b'1:3,7,9:12', ascending."""
+    tail = []
+    for part in reversed(sequence_set.split(b',')):
+        first, _, last = part.partition(b':')
+        low, high = sorted((int(first), int(last or first)))
+        for number in range(high, max(low, high - (limit - len(tail)) + 1) - 1, -1):
+            tail.append(str(number).encode())
+        if len(tail) >= limit:
+            break
+    tail.reverse()
+    return tail
+
+
+# Mailboxes keep receiving the same names (factuur.pdf), so the path and
+# regex work is cached; the random fallback name must not be
+@functools.lru_cache(maxsize=1024)
+def _clean_filename(filename: str) -> str:
+    """Filename without path components and unsafe characters, ending in .pdf."""
+    # Remove path components
+    filename = Path(filename).name
+    
+    # Only allow safe characters
+    safe_filename = _UNSAFE_FILENAME_CHARS_RE.sub('', filename)
+    safe_filename = safe_filename.replace('..', '')
+    
+    # Ensure it ends with .pdf
+    if not _PDF_EXT_RE.search(safe_filename):
+        safe_filename += '.pdf'
+    
+    return safe_filename
+
+
+def _sanitize_filename(filename: str) -> str:
+    """Sanitize filename to prevent path traversal and invalid characters."""
+    safe_filename = _clean_filename(filename)
+    
+    # If empty, generate a name
+    if safe_filename == '.pdf':
+        safe_filename = f"attachment_{uuid.uuid4().hex[:8]}.pdf"
+    
+    return safe_filename
+
+
+def _close_attachment_contents(emails):
+    """
+    Close attachment contents that are file objects (spooled Graph
+    downloads) and were not consumed by storage; closing twice is harmless.
+    """
+    for email_data in emails:
+        for attachment in email_data['attachments']:
+            if not isinstance(attachment['content'], bytes):
+                attachment['content'].close()
+
 
 class EmailReaderBase:
     """Base class for email readers."""
@@ -27,8 +283,11 @@ class EmailReaderBase:
         """Connect to the mail server."""
         raise NotImplementedError
     
-    def disconnect(self):
-        """Disconnect from the mail server."""
+    def disconnect(self, reuse: bool = True):
+        """
+        Disconnect from the mail server. reuse=False after an error, so a
+        session that may be broken is not kept for the next fetch.
+        """
         raise NotImplementedError
     
     def list_folders(self) -> List[Dict]:
@@ -41,6 +300,15 @@ class EmailReaderBase:
         """Fetch emails from the specified folder."""
         raise NotImplementedError
     
+    def iter_email_batches(self, folder: str = 'INBOX', only_unread: bool = True,
+                           subject_filter: str = '', sender_filter: str = '',
+                           limit: int = 50) -> Iterator[List[Dict]]:
+        """
+        Yield the emails of fetch_emails in batches as they arrive from the
+        server, so callers can start processing before the fetch is done.
+        """
+        yield self.fetch_emails(folder, only_unread, subject_filter, sender_filter, limit)
+    
     def mark_as_read(self, message_id: str):
         """Mark an email as read."""
         raise NotImplementedError
@@ -48,28 +316,104 @@ class EmailReaderBase:
     def move_email(self, message_id: str, target_folder: str):
         """Move an email to another folder."""
         raise NotImplementedError
+    
+    def mark_many_as_read(self, message_ids: List[str]):
+        """Mark several emails as read."""
+        for message_id in message_ids:
+            self.mark_as_read(message_id)
+    
+    def move_emails(self, message_ids: List[str], target_folder: str):
+        """Move several emails to another folder."""
+        for message_id in message_ids:
+            self.move_email(message_id, target_folder)
+
+
+class _LazyIMAPEmail:
+    """
+    Email dict for a parsed IMAP message that decodes subject, sender, date
+    and body preview on first access. Messages skipped as duplicates only
+    ever have their Message-ID read.
+    """
+    
+    # dict key -> attribute
+    _KEYS = {
+        'imap_uid': 'imap_uid',
+        'message_id': 'message_id',
+        'subject': 'subject',
+        'from': 'sender',
+        'date': 'date',
+        'body_preview': 'body_preview',
+        'attachments': 'attachments',
+    }
+    
+    def __init__(self, reader: 'IMAPEmailReader', msg, imap_uid: str,
+                 message_id: str, attachments: List[Dict]):
+        self._reader = reader
+        self._msg = msg
+        self.imap_uid = imap_uid
+        self.message_id = message_id
+        self.attachments = attachments
+    
+    @functools.cached_property
+    def subject(self) -> str:
+        return self._reader._decode_header(self._msg.get('Subject', ''))
+    
+    @functools.cached_property
+    def sender(self) -> str:
+        return self._reader._decode_header(self._msg.get('From', ''))
+    
+    @functools.cached_property
+    def date(self) -> Optional[datetime]:
+        return self._reader._parse_date(self._msg.get('Date', ''))
+    
+    @functools.cached_property
+    def body_preview(self) -> str:
+        return self._reader._get_body_preview(self._msg)
+    
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, self._KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+    
+    def __contains__(self, key) -> bool:
+        return key in self._KEYS
+    
+    def get(self, key: str, default=None):
+        return self[key] if key in self._KEYS else default
 
 
 class IMAPEmailReader(EmailReaderBase):
     """IMAP email reader for reading from shared mailboxes."""
     
     def __init__(self, server: str, port: int, username: str, password: str, 
-                 use_ssl: bool = True, email_address: str = None):
+                 use_ssl: bool = True, email_address: str = None,
+                 fetch_batch_size: int = _IMAP_FETCH_BATCH_SIZE):
         self.server = server
         self.port = port
         self.username = username
         self.password = password
         self.use_ssl = use_ssl
         self.email_address = email_address  # Shared mailbox address
+        self.fetch_batch_size = fetch_batch_size
         self.connection: Optional[imaplib.IMAP4_SSL] = None
     
+    def _pool_key(self) -> tuple:
+        return (self.server, self.port, self.use_ssl, self.username, self.password, self.email_address)
+    
     def connect(self) -> bool:
-        """Connect to the IMAP server."""
+        """Connect to the IMAP server, reusing a pooled session when still alive."""
+        self.connection = imap_pool.acquire(self._pool_key(), self._login)
+        return True
+    
+    def _login(self) -> imaplib.IMAP4:
+        """Open a new connection and log in."""
+        connection = None
         try:
             if self.use_ssl:
-                self.connection = imaplib.IMAP4_SSL(self.server, self.port)
+                connection = imaplib.IMAP4_SSL(self.server, self.port)
             else:
-                self.connection = imaplib.IMAP4(self.server, self.port)
+                connection = imaplib.IMAP4(self.server, self.port)
             
             # For shared mailboxes in Microsoft 365, use: user@domain.com\shared@domain.com
             login_user = self.username
@@ -77,20 +421,23 @@ class IMAPEmailReader(EmailReaderBase):
                 # Shared mailbox format for Exchange/Microsoft 365
                 login_user = f"{self.username}\\{self.email_address}"
             
-            self.connection.login(login_user, self.password)
+            connection.login(login_user, self.password)
             logger.info(f"Successfully connected to {self.server}")
-            return True
+            return connection
         except Exception as e:
             logger.error(f"Failed to connect to IMAP server: {e}")
+            # Never hand a half-open (not logged in) session to the pool
+            if connection:
+                logout_quietly(connection)
             raise
     
-    def disconnect(self):
-        """Disconnect from the IMAP server."""
+    def disconnect(self, reuse: bool = True):
+        """Release the connection; it stays logged in in the pool for reuse."""
         if self.connection:
-            try:
-                self.connection.logout()
-            except Exception:
-                pass
+            if reuse:
+                imap_pool.release(self._pool_key(), self.connection)
+            else:
+                imap_pool.discard(self.connection)
             self.connection = None
     
     def list_folders(self) -> List[Dict]:
@@ -106,30 +453,37 @@ class IMAPEmailReader(EmailReaderBase):
                 return folders
             
             for folder_data in folder_list:
-                if isinstance(folder_data, bytes):
-                    # Parse folder response: (\\Flags) "delimiter" "folder_name"
-                    decoded = folder_data.decode('utf-8', errors='replace')
-                    
-                    # Extract folder name (last part after delimiter)
-                    # Format: (\HasNoChildren) "/" "INBOX/Subfolder"
-                    match = re.search(r'"([^"]+)"\s+"?([^"]+)"?$', decoded)
-                    if match:
-                        delimiter = match.group(1)
-                        folder_name = match.group(2).strip('"')
-                        
-                        # Calculate depth based on delimiter
-                        depth = folder_name.count(delimiter) if delimiter else 0
-                        
-                        # Get display name (last part)
-                        display_name = folder_name.split(delimiter)[-1] if delimiter else folder_name
-                        
-                        folders.append({
-                            'id': folder_name,
-                            'name': folder_name,
-                            'display_name': display_name,
-                            'depth': depth,
-                            'has_children': '\\HasChildren' in decoded
-                        })
+                # Names with special characters arrive as (b'... {n}', b'name')
+                literal = None
+                if isinstance(folder_data, tuple):
+                    folder_data, literal = folder_data
+                    literal = literal.decode('utf-8', errors='replace')
+                if not isinstance(folder_data, bytes):
+                    continue
+                
+                # Parse folder response: (\Flags) "delimiter" "folder_name"
+                decoded = folder_data.decode('utf-8', errors='replace')
+                parsed = _parse_list_line(decoded)
+                if parsed is None:
+                    continue
+                
+                flags, delimiter, folder_name = parsed
+                if literal is not None:
+                    folder_name = literal
+                
+                # Calculate depth based on delimiter
+                depth = folder_name.count(delimiter) if delimiter else 0
+                
+                # Get display name (last part)
+                display_name = folder_name.split(delimiter)[-1] if delimiter else folder_name
+                
+                folders.append({
+                    'id': folder_name,
+                    'name': folder_name,
+                    'display_name': display_name,
+                    'depth': depth,
+                    'has_children': '\\HasChildren' in flags
+                })
             
             # Sort folders alphabetically
             folders.sort(key=lambda x: x['name'].lower())
@@ -158,31 +512,30 @@ class IMAPEmailReader(EmailReaderBase):
         if not date_str:
             return None
         
-        # Common date formats
-        formats = [
-            '%a, %d %b %Y %H:%M:%S %z',
-            '%d %b %Y %H:%M:%S %z',
-            '%a, %d %b %Y %H:%M:%S',
-            '%d %b %Y %H:%M:%S',
-        ]
-        
-        # Remove parenthetical timezone names
-        date_str = re.sub(r'\s*\([^)]+\)\s*$', '', date_str.strip())
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        # Fallback
-        return timezone.now()
+        # RFC 5322 dates, including a trailing "(CET)"-style comment
+        try:
+            return parsedate_to_datetime(date_str)
+        except (TypeError, ValueError):
+            # Fallback
+            return timezone.now()
     
-    def _extract_attachments(self, msg) -> List[Dict]:
-        """Extract PDF attachments from an email message."""
+    def _extract_attachments(self, msg, pdf_part_numbers: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Extract PDF attachments from an email message. With the part numbers
+        from BODYSTRUCTURE only those parts are checked instead of walking
+        every MIME node.
+        """
         attachments = []
         
-        for part in msg.walk():
+        parts = msg.walk()
+        if pdf_part_numbers is not None:
+            try:
+                parts = [_part_by_number(msg, number) for number in pdf_part_numbers]
+            except (IndexError, ValueError):
+                # Parsed message differs from the server's structure
+                parts = msg.walk()
+        
+        for part in parts:
             content_disposition = str(part.get('Content-Disposition', ''))
             content_type = part.get_content_type()
             
@@ -193,11 +546,11 @@ class IMAPEmailReader(EmailReaderBase):
                     filename = self._decode_header(filename)
                     
                     # Only process PDF files
-                    if filename.lower().endswith('.pdf') or content_type == 'application/pdf':
+                    if content_type == 'application/pdf' or _PDF_EXT_RE.search(filename):
                         payload = part.get_payload(decode=True)
                         if payload:
                             # Validate PDF magic bytes
-                            if payload[:4] == b'%PDF':
+                            if payload.startswith(b'%PDF'):
                                 attachments.append({
                                     'filename': filename,
                                     'content': payload,
@@ -211,20 +564,24 @@ class IMAPEmailReader(EmailReaderBase):
     
     def _get_body_preview(self, msg, max_length: int = 500) -> str:
         """Extract a preview of the email body."""
-        body = ''
+        payload = None
         
         if msg.is_multipart():
+            # walk() is lazy; stop at the first text/plain part
             for part in msg.walk():
                 content_type = part.get_content_type()
                 if content_type == 'text/plain':
                     payload = part.get_payload(decode=True)
                     if payload:
-                        body = payload.decode('utf-8', errors='replace')
                         break
         else:
             payload = msg.get_payload(decode=True)
-            if payload:
-                body = payload.decode('utf-8', errors='replace')
+        
+        # A UTF-8 character is at most 4 bytes, so only this much of the
+        # payload can end up in the preview; don't decode the rest
+        body = ''
+        if payload:
+            body = payload.lstrip()[:max_length * 4].decode('utf-8', errors='replace')
         
         # Clean and truncate
         body = body.strip()[:max_length]
@@ -233,15 +590,147 @@ class IMAPEmailReader(EmailReaderBase):
         
         return body
     
+    def _search_ids(self, search_criteria: str, limit: int) -> Optional[List[bytes]]:
+        """
+        UIDs matching the criteria, only the last `limit` when set. UIDs stay
+        valid across EXPUNGEs and pooled sessions, unlike message numbers.
+        With ESEARCH (RFC 4731) the server answers with a compact sequence
+        set (1:5000) instead of every number; None when the search failed.
+        """
+        if limit and 'ESEARCH' in self.connection.capabilities:
+            try:
+                status, _ = self.connection.uid('SEARCH', 'RETURN (ALL)', search_criteria)
+            except imaplib.IMAP4.error as e:
+                logger.warning(f"ESEARCH failed, falling back to SEARCH: {e}")
+                status = 'BAD'
+            if status == 'OK':
+                _, data = self.connection.response('ESEARCH')
+                match = _ESEARCH_ALL_RE.search(b' '.join(d for d in data if d))
+                return _tail_of_sequence_set(match.group(1), limit) if match else []
+        
+        status, message_ids = self.connection.uid('SEARCH', None, search_criteria)
+        if status != 'OK':
+            return None
+        
+        ids = message_ids[0].split()
+        
+        # Limit the number of emails to process
+        return ids[-limit:] if limit else ids
+    
+    def _fetch_batches(self, ids: List[bytes], message_parts: str):
+        """
+        Yield (batch, FETCH response data) with one FETCH round-trip per
+        fetch_batch_size UIDs. Failed batches yield None.
+        """
+        ids_iter = iter(ids)
+        while True:
+            batch = list(itertools.islice(ids_iter, self.fetch_batch_size))
+            if not batch:
+                return
+            
+            status, msg_data = self.connection.uid('FETCH', b','.join(batch), message_parts)
+            if status != 'OK':
+                logger.warning(f"FETCH {message_parts} failed for {len(batch)} messages: {msg_data}")
+                msg_data = None
+            yield batch, msg_data
+    
+    def _pdf_candidates(self, ids: List[bytes]) -> Dict[bytes, Optional[List[str]]]:
+        """
+        Filter UIDs down to those whose BODYSTRUCTURE may contain
+        a PDF, so the full message is only downloaded for those. Maps
+        each candidate to its PDF part numbers, or None when the parts
+        could not be located and the whole message must be walked.
+        """
+        candidates = {}
+        for batch, msg_data in self._fetch_batches(ids, '(BODYSTRUCTURE)'):
+            if msg_data is None:
+                # Cannot tell; let the full fetch decide
+                candidates.update(dict.fromkeys(batch))
+                continue
+            
+            # Join each message's lines (filenames may arrive as literals)
+            structures = {}
+            current = None
+            for item in msg_data:
+                line = b''.join(item) if isinstance(item, tuple) else item
+                if not isinstance(line, bytes):
+                    continue
+                match = _FETCH_LINE_RE.match(line)
+                if match:
+                    current = match.group(1)
+                    structures[current] = line
+                elif current is not None:
+                    structures[current] += line
+            
+            # Lines start with the message number; key them by their UID item
+            parsed = {}
+            for line in structures.values():
+                try:
+                    items = _parse_imap_list(line, line.index(b'('))
+                    fields = dict(zip(items[::2], items[1::2]))
+                    uid = fields[b'UID']
+                    part_numbers = _pdf_part_numbers(fields[b'BODYSTRUCTURE'])
+                except (IndexError, KeyError, TypeError, ValueError):
+                    match = _FETCH_UID_RE.search(line)
+                    if not match:
+                        continue
+                    uid, part_numbers = match.group(1), None
+                parsed[uid] = (line, part_numbers)
+            
+            for msg_id in batch:
+                if msg_id not in parsed:
+                    candidates[msg_id] = None
+                    continue
+                
+                line, part_numbers = parsed[msg_id]
+                if part_numbers:
+                    candidates[msg_id] = part_numbers
+                elif part_numbers is None and _PDF_STRUCTURE_RE.search(line):
+                    candidates[msg_id] = None
+        return candidates
+    
+    def _fetch_raw_messages(self, ids: List[bytes]):
+        """Yield (UID, raw RFC822 bytes) for the given UIDs."""
+        # BODY.PEEK[] leaves \Seen alone; mark_as_read decides about that
+        for _batch, msg_data in self._fetch_batches(ids, '(BODY.PEEK[])'):
+            if msg_data is None:
+                continue
+            
+            # The response interleaves (b'<num> (UID <uid> BODY[] {size}', literal)
+            # tuples with closing lines; servers that send the UID after the
+            # message put it in that closing line, b' UID <uid>)'
+            pending = None
+            for item in msg_data:
+                if isinstance(item, tuple):
+                    match = _FETCH_UID_RE.search(item[0])
+                    if match:
+                        yield match.group(1), item[1]
+                        pending = None
+                    else:
+                        pending = item[1]
+                elif pending is not None and isinstance(item, bytes):
+                    match = _FETCH_UID_RE.search(item)
+                    if match:
+                        yield match.group(1), pending
+                    pending = None
+    
     def fetch_emails(self, folder: str = 'INBOX', only_unread: bool = True,
                      subject_filter: str = '', sender_filter: str = '',
                      limit: int = 50) -> List[Dict]:
         """Fetch emails from the specified folder."""
+        return [
+            email_data
+            for batch in self.iter_email_batches(folder, only_unread, subject_filter, sender_filter, limit)
+            for email_data in batch
+        ]
+    
+    def iter_email_batches(self, folder: str = 'INBOX', only_unread: bool = True,
+                           subject_filter: str = '', sender_filter: str = '',
+                           limit: int = 50) -> Iterator[List[Dict]]:
+        """Yield the emails with PDF attachments per FETCH batch."""
         if not self.connection:
             raise RuntimeError("Not connected to IMAP server")
         
-        emails = []
-        
         try:
             # Select the folder
             status, _ = self.connection.select(folder)
@@ -259,76 +748,98 @@ class IMAPEmailReader(EmailReaderBase):
             
             search_criteria = ' '.join(criteria) if criteria else 'ALL'
             
-            # Search for emails
-            status, message_ids = self.connection.search(None, search_criteria)
-            if status != 'OK':
-                return emails
-            
-            ids = message_ids[0].split()
-            
-            # Limit the number of emails to process
-            ids = ids[-limit:] if limit else ids
-            
-            for msg_id in ids:
-                try:
-                    status, msg_data = self.connection.fetch(msg_id, '(RFC822)')
-                    if status != 'OK':
-                        continue
-                    
-                    raw_email = msg_data[0][1]
-                    msg = email.message_from_bytes(raw_email)
-                    
-                    # Extract message ID (use IMAP UID as fallback)
-                    message_id = msg.get('Message-ID', f'imap-{msg_id.decode()}')
-                    
-                    # Extract attachments (only PDFs)
-                    attachments = self._extract_attachments(msg)
-                    
-                    # Only include emails that have PDF attachments
-                    if attachments:
-                        emails.append({
-                            'imap_uid': msg_id.decode(),
-                            'message_id': message_id,
-                            'subject': self._decode_header(msg.get('Subject', '')),
-                            'from': self._decode_header(msg.get('From', '')),
-                            'date': self._parse_date(msg.get('Date', '')),
-                            'body_preview': self._get_body_preview(msg),
-                            'attachments': attachments
-                        })
-                
-                except Exception as e:
-                    logger.error(f"Error processing email {msg_id}: {e}")
-                    continue
+            # Search for emails, limited to the last `limit` matches
+            ids = self._search_ids(search_criteria, limit)
+            if ids is None:
+                return
             
-            return emails
+            ids_iter = iter(ids)
+            while True:
+                batch = list(itertools.islice(ids_iter, self.fetch_batch_size))
+                if not batch:
+                    return
+                # Skip the download of messages that cannot have a PDF attachment
+                yield self._parse_messages(self._pdf_candidates(batch))
         
         except Exception as e:
             logger.error(f"Error fetching emails: {e}")
             raise
     
+    def _parse_messages(self, candidates: Dict[bytes, Optional[List[str]]]) -> List['_LazyIMAPEmail']:
+        """Download and parse the given messages; keep those with PDF attachments."""
+        emails = []
+        for msg_id, raw_email in self._fetch_raw_messages(list(candidates)):
+            try:
+                msg = email.message_from_bytes(raw_email)
+                # UIDs are ASCII digits
+                uid_str = msg_id.decode('ascii')
+                
+                # Extract message ID (use IMAP UID as fallback)
+                message_id = msg.get('Message-ID') or f'imap-{uid_str}'
+                
+                # Extract attachments (only PDFs)
+                attachments = self._extract_attachments(msg, candidates.get(msg_id))
+                
+                # Only include emails that have PDF attachments; the
+                # other headers are decoded when first read
+                if attachments:
+                    emails.append(_LazyIMAPEmail(
+                        self, msg,
+                        imap_uid=uid_str,
+                        message_id=message_id,
+                        attachments=attachments,
+                    ))
+            
+            except Exception as e:
+                logger.error(f"Error processing email {msg_id}: {e}")
+                continue
+        
+        return emails
+    
     def mark_as_read(self, imap_uid: str):
         """Mark an email as read."""
-        if not self.connection:
+        self.mark_many_as_read([imap_uid])
+    
+    def move_email(self, imap_uid: str, target_folder: str):
+        """Move an email to another folder."""
+        self.move_emails([imap_uid], target_folder)
+    
+    def mark_many_as_read(self, imap_uids: List[str]):
+        """Mark emails as read with one UID STORE for the whole set."""
+        if not self.connection or not imap_uids:
             return
         
+        # imaplib encodes str message sets itself
         try:
-            self.connection.store(imap_uid.encode(), '+FLAGS', '\\Seen')
+            self.connection.uid('STORE', ','.join(imap_uids), '+FLAGS', '\\Seen')
         except Exception as e:
-            logger.error(f"Error marking email as read: {e}")
+            logger.error(f"Error marking emails as read: {e}")
     
-    def move_email(self, imap_uid: str, target_folder: str):
-        """Move an email to another folder."""
-        if not self.connection:
+    def move_emails(self, imap_uids: List[str], target_folder: str):
+        """
+        Move emails to another folder: one UID MOVE (RFC 6851) for the
+        whole set, or COPY + STORE + EXPUNGE on servers without MOVE.
+        """
+        if not self.connection or not imap_uids:
             return
         
+        uid_set = ','.join(imap_uids)
         try:
+            if 'MOVE' in self.connection.capabilities:
+                self.connection.uid('MOVE', uid_set, target_folder)
+                return
+            
             # Copy to target folder
-            self.connection.copy(imap_uid.encode(), target_folder)
-            # Mark original for deletion
-            self.connection.store(imap_uid.encode(), '+FLAGS', '\\Deleted')
-            self.connection.expunge()
+            self.connection.uid('COPY', uid_set, target_folder)
+            # Mark originals for deletion
+            self.connection.uid('STORE', uid_set, '+FLAGS', '\\Deleted')
+            if 'UIDPLUS' in self.connection.capabilities:
+                # Leaves messages other clients flagged \Deleted alone
+                self.connection.uid('EXPUNGE', uid_set)
+            else:
+                self.connection.expunge()
         except Exception as e:
-            logger.error(f"Error moving email: {e}")
+            logger.error(f"Error moving emails: {e}")
 
 
 class Microsoft365EmailReader(EmailReaderBase):
@@ -344,12 +855,32 @@ class Microsoft365EmailReader(EmailReaderBase):
         self.tenant_id = tenant_id
         self.email_address = email_address
         self.access_token = None
+        self._session = None
+    
+    @property
+    def session(self):
+        """Keep-alive HTTP session for all Graph calls, created on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            self._session = requests.Session()
+            # Retries only apply to idempotent methods (GET) by default
+            self._session.mount('https://', HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=10,
+                max_retries=Retry(
+                    total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                    # Hand the last response back instead of raising RetryError
+                    raise_on_status=False,
+                ),
+            ))
+        return self._session
     
     def connect(self) -> bool:
         """Get OAuth2 access token for Microsoft Graph API."""
         try:
-            import requests
-            
             token_url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
             
             data = {
@@ -359,10 +890,12 @@ class Microsoft365EmailReader(EmailReaderBase):
                 'scope': 'https://graph.microsoft.com/.default'
             }
             
-            response = requests.post(token_url, data=data)
+            response = self.session.post(token_url, data=data)
             response.raise_for_status()
             
             self.access_token = response.json().get('access_token')
+            # requests sets Content-Type per body (json=/data=)
+            self.session.headers['Authorization'] = f'Bearer {self.access_token}'
             logger.info("Successfully obtained Microsoft 365 access token")
             return True
         
@@ -370,65 +903,78 @@ class Microsoft365EmailReader(EmailReaderBase):
             logger.error(f"Failed to connect to Microsoft 365: {e}")
             raise
     
-    def disconnect(self):
-        """Clear the access token."""
+    def disconnect(self, reuse: bool = True):
+        """Clear the access token and close the HTTP session."""
         self.access_token = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
     
     def list_folders(self) -> List[Dict]:
         """List available folders in the Microsoft 365 mailbox."""
         if not self.access_token:
             raise RuntimeError("Not connected to Microsoft 365")
         
-        import requests
-        
         folders = []
         
         try:
             # Get all mail folders (including child folders)
             url = f"https://graph.microsoft.com/v1.0/users/{self.email_address}/mailFolders"
             
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-            
+            select = 'id,displayName,parentFolderId,childFolderCount,totalItemCount,unreadItemCount'
             params = {
                 '$top': 100,
-                '$select': 'id,displayName,parentFolderId,childFolderCount,totalItemCount,unreadItemCount'
+                '$select': select,
+                # Two levels of child folders in the same response
+                '$expand': f'childFolders($select={select};$expand=childFolders($select={select}))'
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            def get_folders(folders_url):
+                response = self.session.get(folders_url, params=params)
+                if response.status_code == 400:
+                    # Server refused the nested $expand; list level by level
+                    params.pop('$expand', None)
+                    response = self.session.get(folders_url, params=params)
+                return response
+            
+            response = get_folders(url)
             response.raise_for_status()
             
             root_folders = response.json().get('value', [])
             
             def process_folder(folder_data, depth=0, parent_path=''):
-                """Process a folder and recursively get child folders."""
+                """Process a folder and its (expanded or fetched) child folders."""
                 folder_id = folder_data.get('id')
                 display_name = folder_data.get('displayName', '')
                 
                 # Build the path for nested folders
                 folder_path = f"{parent_path}/{display_name}" if parent_path else display_name
                 
+                child_count = folder_data.get('childFolderCount', 0)
                 folders.append({
                     'id': folder_id,
                     'name': folder_path,
                     'display_name': display_name,
                     'depth': depth,
-                    'has_children': folder_data.get('childFolderCount', 0) > 0,
+                    'has_children': child_count > 0,
                     'total_items': folder_data.get('totalItemCount', 0),
                     'unread_items': folder_data.get('unreadItemCount', 0)
                 })
                 
-                # Get child folders if any
-                if folder_data.get('childFolderCount', 0) > 0:
-                    child_url = f"https://graph.microsoft.com/v1.0/users/{self.email_address}/mailFolders/{folder_id}/childFolders"
-                    child_response = requests.get(child_url, headers=headers, params=params)
+                if child_count > 0:
+                    child_folders = folder_data.get('childFolders')
+                    
+                    # Below the expanded levels (or a truncated expansion) fetch them
+                    if child_folders is None or len(child_folders) < child_count:
+                        child_url = f"https://graph.microsoft.com/v1.0/users/{self.email_address}/mailFolders/{folder_id}/childFolders"
+                        child_response = get_folders(child_url)
+                        
+                        child_folders = []
+                        if child_response.status_code == 200:
+                            child_folders = child_response.json().get('value', [])
                     
-                    if child_response.status_code == 200:
-                        child_folders = child_response.json().get('value', [])
-                        for child in child_folders:
-                            process_folder(child, depth + 1, folder_path)
+                    for child in child_folders:
+                        process_folder(child, depth + 1, folder_path)
             
             for folder_data in root_folders:
                 process_folder(folder_data)
@@ -446,16 +992,15 @@ class Microsoft365EmailReader(EmailReaderBase):
         if not self.access_token:
             raise RuntimeError("Not connected to Microsoft 365")
         
-        import requests
-        
         emails = []
+        attachments = []
         
         try:
             # Build the Graph API URL
             base_url = f"https://graph.microsoft.com/v1.0/users/{self.email_address}/mailFolders/{folder}/messages"
             
-            # Build filter query
-            filters = []
+            # Build filter query; mail without attachments is dropped anyway
+            filters = ['hasAttachments eq true']
             if only_unread:
                 filters.append("isRead eq false")
             if subject_filter:
@@ -463,21 +1008,17 @@ class Microsoft365EmailReader(EmailReaderBase):
             if sender_filter:
                 filters.append(f"contains(from/emailAddress/address, '{sender_filter}')")
             
+            # Only the fields used below; attachment bytes are downloaded
+            # separately, for PDFs only
             params = {
                 '$top': limit,
                 '$orderby': 'receivedDateTime desc',
-                '$expand': 'attachments'
+                '$select': 'id,subject,from,receivedDateTime,bodyPreview,hasAttachments',
+                '$expand': 'attachments($select=id,name,contentType,size)',
+                '$filter': ' and '.join(filters),
             }
             
-            if filters:
-                params['$filter'] = ' and '.join(filters)
-            
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(base_url, headers=headers, params=params)
+            response = self.session.get(base_url, params=params)
             response.raise_for_status()
             
             messages = response.json().get('value', [])
@@ -496,23 +1037,36 @@ class Microsoft365EmailReader(EmailReaderBase):
                     logger.info(f"  - Attachment: {att_name} ({att_type})")
                     
                     if att.get('contentType') == 'application/pdf' or \
-                       att.get('name', '').lower().endswith('.pdf'):
+                       _PDF_EXT_RE.search(att.get('name', '')):
                         
-                        # Get attachment content
-                        if att.get('@odata.type') == '#microsoft.graph.fileAttachment':
-                            content = att.get('contentBytes', '')
-                            if content:
-                                import base64
-                                decoded = base64.b64decode(content)
-                                
-                                # Validate PDF magic bytes
-                                if decoded[:4] == b'%PDF':
-                                    attachments.append({
-                                        'filename': att.get('name', 'attachment.pdf'),
-                                        'content': decoded,
-                                        'content_type': att.get('contentType', 'application/pdf'),
-                                        'size': att.get('size', len(decoded))
-                                    })
+                        # Get attachment content (raw bytes, no base64)
+                        if att.get('@odata.type', '#microsoft.graph.fileAttachment') == '#microsoft.graph.fileAttachment':
+                            content = tempfile.SpooledTemporaryFile(max_size=_ATTACHMENT_SPOOL_SIZE)
+                            try:
+                                with self.session.get(
+                                    f"https://graph.microsoft.com/v1.0/users/{self.email_address}/messages/{msg['id']}/attachments/{att['id']}/$value",
+                                    stream=True
+                                ) as content_response:
+                                    content_response.raise_for_status()
+                                    for chunk in content_response.iter_content(_ATTACHMENT_CHUNK_SIZE):
+                                        content.write(chunk)
+                            except Exception:
+                                content.close()
+                                raise
+                            size = content.tell()
+                            
+                            # Validate PDF magic bytes
+                            content.seek(0)
+                            if content.read(4) != b'%PDF':
+                                logger.warning(f"Skipping {att_name}: not a valid PDF")
+                                content.close()
+                                continue
+                            attachments.append({
+                                'filename': att.get('name', 'attachment.pdf'),
+                                'content': content,
+                                'content_type': att.get('contentType', 'application/pdf'),
+                                'size': att.get('size', size)
+                            })
                 
                 if attachments:
                     # Parse sender - prefer emailAddress, fall back to name
@@ -542,6 +1096,8 @@ class Microsoft365EmailReader(EmailReaderBase):
         
         except Exception as e:
             logger.error(f"Error fetching emails from Microsoft 365: {e}")
+            # Downloads of the messages collected so far are never stored
+            _close_attachment_contents(emails + [{'attachments': attachments}])
             raise
     
     def mark_as_read(self, message_id: str):
@@ -549,16 +1105,9 @@ class Microsoft365EmailReader(EmailReaderBase):
         if not self.access_token:
             return
         
-        import requests
-        
         try:
             url = f"https://graph.microsoft.com/v1.0/users/{self.email_address}/messages/{message_id}"
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-            
-            requests.patch(url, headers=headers, json={'isRead': True})
+            self.session.patch(url, json={'isRead': True})
         except Exception as e:
             logger.error(f"Error marking email as read in Microsoft 365: {e}")
     
@@ -567,33 +1116,47 @@ class Microsoft365EmailReader(EmailReaderBase):
         if not self.access_token:
             return
         
-        import requests
-        
         try:
             url = f"https://graph.microsoft.com/v1.0/users/{self.email_address}/messages/{message_id}/move"
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-            
-            requests.post(url, headers=headers, json={'destinationId': target_folder})
+            self.session.post(url, json={'destinationId': target_folder})
         except Exception as e:
             logger.error(f"Error moving email in Microsoft 365: {e}")
 
 
+class _OCRQueue:
+    """
+    Hands stored attachments to OCR worker threads. At most
+    _OCR_MAX_PENDING jobs are queued at once; put() blocks the fetching
+    thread until a worker frees a slot.
+    """
+    
+    def __init__(self, executor: ThreadPoolExecutor, ocr_func, user):
+        self._executor = executor
+        self._ocr_func = ocr_func
+        self._user = user
+        self._slots = threading.BoundedSemaphore(_OCR_MAX_PENDING)
+        # future -> EmailAttachment
+        self.futures = {}
+    
+    def put(self, email_attachment):
+        self._slots.acquire()
+        future = self._executor.submit(self._ocr_func, email_attachment, self._user)
+        future.add_done_callback(lambda _future: self._slots.release())
+        self.futures[future] = email_attachment
+
+
 class EmailImportService:
     """
     Main service for importing invoices from emails.
     """
     
-    def __init__(self):
-        from apps.invoicing.ocr.services import InvoiceImportService
-        self.ocr_service = InvoiceImportService()
+    @functools.cached_property
+    def ocr_service(self) -> InvoiceImportService:
+        """Created on first use; connection tests and folder listings never OCR."""
+        return InvoiceImportService()
     
     def _get_reader(self, config) -> EmailReaderBase:
         """Get the appropriate email reader for the config."""
-        from .models import MailboxConfig
-        
         if config.protocol == MailboxConfig.Protocol.MICROSOFT_365:
             return Microsoft365EmailReader(
                 client_id=config.ms365_client_id,
@@ -608,7 +1171,8 @@ class EmailImportService:
                 username=config.username,
                 password=config.password,
                 use_ssl=config.imap_use_ssl,
-                email_address=config.email_address
+                email_address=config.email_address,
+                fetch_batch_size=config.imap_fetch_batch_size
             )
     
     def test_connection(self, config) -> Tuple[bool, str]:
@@ -642,8 +1206,6 @@ class EmailImportService:
         Returns:
             Dict with statistics about the import
         """
-        from .models import EmailImport, EmailAttachment, MailboxConfig
-        
         logger.info(f"fetch_and_process_emails: Starting for {config.name}")
         logger.info(f"  - Folder: {config.folder_name}")
         logger.info(f"  - Only unread: {config.only_unread}")
@@ -659,188 +1221,235 @@ class EmailImportService:
             'errors': []
         }
         
+        reuse_connection = True
         try:
             reader.connect()
             
-            # Fetch emails with PDF attachments
-            emails = reader.fetch_emails(
-                folder=config.folder_name,
-                only_unread=config.only_unread,
-                subject_filter=config.subject_filter,
-                sender_filter=config.sender_filter,
-                limit=limit
-            )
-            
-            stats['emails_found'] = len(emails)
+            processed_imports = []
             
-            for email_data in emails:
+            # OCR runs in worker threads while the next FETCH batches are
+            # downloaded and stored; tesseract is a subprocess per file
+            with ThreadPoolExecutor(max_workers=_OCR_MAX_WORKERS) as executor:
+                ocr_queue = _OCRQueue(executor, self._ocr_attachment, user)
+                
                 try:
-                    # Check if we already processed this email
-                    message_id = email_data['message_id']
-                    if EmailImport.objects.filter(
-                        mailbox_config=config,
-                        email_message_id=message_id
-                    ).exists():
-                        logger.info(f"Email already processed: {message_id}")
-                        continue
-                    
-                    # Process each email in its own transaction
-                    with transaction.atomic():
-                        # Create email import record
-                        email_import = EmailImport.objects.create(
-                            mailbox_config=config,
-                            email_message_id=message_id,
-                            email_subject=email_data['subject'][:500],
-                            email_from=email_data['from'][:255],
-                            email_date=email_data['date'] or timezone.now(),
-                            email_body_preview=email_data['body_preview'],
-                            status=EmailImport.Status.PROCESSING
-                        )
+                    # Fetch emails with PDF attachments
+                    for emails in reader.iter_email_batches(
+                        folder=config.folder_name,
+                        only_unread=config.only_unread,
+                        subject_filter=config.subject_filter,
+                        sender_filter=config.sender_filter,
+                        limit=limit
+                    ):
+                        stats['emails_found'] += len(emails)
                         
-                        stats['attachments_found'] += len(email_data['attachments'])
+                        try:
+                            stored = self._store_batch(config, emails, stats)
+                        except Exception as e:
+                            logger.error(f"Error storing emails: {e}")
+                            stats['errors'].append(str(e))
+                            continue
                         
-                        # Process each PDF attachment
-                        for attachment in email_data['attachments']:
-                            try:
-                                # Sanitize filename
-                                safe_filename = self._sanitize_filename(attachment['filename'])
-                                
-                                # Create attachment record
-                                email_attachment = EmailAttachment.objects.create(
-                                    email_import=email_import,
-                                    original_filename=safe_filename,
-                                    content_type=attachment['content_type'],
-                                    file_size=attachment['size']
-                                )
-                                
-                                # Save the file
-                                email_attachment.file.save(
-                                    safe_filename,
-                                    ContentFile(attachment['content'])
-                                )
-                                
-                                # Process with OCR
-                                try:
-                                    from django.core.files.uploadedfile import InMemoryUploadedFile
-                                    from io import BytesIO
-                                    
-                                    # Create a file-like object for the OCR service
-                                    file_obj = BytesIO(attachment['content'])
-                                    file_obj.name = safe_filename
-                                    file_obj.size = attachment['size']
-                                    
-                                    # Use SimpleUploadedFile
-                                    from django.core.files.uploadedfile import SimpleUploadedFile
-                                    uploaded_file = SimpleUploadedFile(
-                                        name=safe_filename,
-                                        content=attachment['content'],
-                                        content_type=attachment['content_type']
-                                    )
-                                    
-                                    # Process with OCR
-                                    invoice_import = self.ocr_service.process_upload(
-                                        uploaded_file, 
-                                        user
-                                    )
-                                    
-                                    # Link to email attachment
-                                    email_attachment.invoice_import = invoice_import
-                                    email_attachment.is_processed = True
-                                    email_attachment.save()
-                                    
-                                    stats['attachments_processed'] += 1
-                                
-                                except Exception as e:
-                                    email_attachment.error_message = str(e)
-                                    email_attachment.save()
-                                    logger.error(f"OCR processing failed for {safe_filename}: {e}")
+                        for email_data, email_import, attachments in stored:
+                            # Only committed rows go to the OCR threads
+                            for email_attachment in attachments:
+                                ocr_queue.put(email_attachment)
+                            processed_imports.append(email_import)
+                        
+                        # One command per batch instead of a round trip per
+                        # email (outside transaction)
+                        message_ids = [
+                            email_data.get('imap_uid', email_data['message_id'])
+                            for email_data, _import, _attachments in stored
+                        ]
+                        try:
+                            # Mark emails as read if configured
+                            if config.mark_as_read:
+                                reader.mark_many_as_read(message_ids)
                             
-                            except Exception as e:
-                                logger.error(f"Error processing attachment: {e}")
-                                stats['errors'].append(f"Bijlage fout: {str(e)}")
+                            # Move emails if configured
+                            if config.move_to_folder:
+                                reader.move_emails(message_ids, config.move_to_folder)
+                            
+                            stats['emails_processed'] += len(stored)
                         
-                        # Update email import status
-                        email_import.status = EmailImport.Status.AWAITING_REVIEW
-                        email_import.processed_at = timezone.now()
-                        email_import.save()
-                    
-                    # Mark email as read if configured (outside transaction)
-                    if config.mark_as_read:
-                        imap_uid = email_data.get('imap_uid', email_data['message_id'])
-                        reader.mark_as_read(imap_uid)
-                    
-                    # Move email if configured (outside transaction)
-                    if config.move_to_folder:
-                        imap_uid = email_data.get('imap_uid', email_data['message_id'])
-                        reader.move_email(imap_uid, config.move_to_folder)
-                    
-                    stats['emails_processed'] += 1
+                        except Exception as e:
+                            logger.error(f"Error processing emails: {e}")
+                            stats['errors'].append(str(e))
                 
-                except Exception as e:
-                    logger.error(f"Error processing email: {e}")
-                    stats['errors'].append(str(e))
-            
-            # Update config statistics
-            config.last_fetch_at = timezone.now()
-            config.last_error = ''
-            config.total_emails_processed += stats['emails_processed']
-            config.total_invoices_imported += stats['attachments_processed']
-            config.status = MailboxConfig.Status.ACTIVE
-            config.save()
+                finally:
+                    # Link whatever was queued, also when the fetch broke off
+                    stats['attachments_processed'] += self._link_ocr_results(ocr_queue.futures)
+                    self._mark_awaiting_review(processed_imports)
+                    if processed_imports:
+                        EmailImport.invalidate_cached_listings()
+            
+            # Update config statistics in one UPDATE; F() keeps the counters
+            # right when a scheduled and a manual fetch overlap
+            now = timezone.now()
+            MailboxConfig.objects.filter(pk=config.pk).update(
+                last_fetch_at=now,
+                last_error='',
+                total_emails_processed=F('total_emails_processed') + stats['emails_processed'],
+                total_invoices_imported=F('total_invoices_imported') + stats['attachments_processed'],
+                status=MailboxConfig.Status.ACTIVE,
+                updated_at=now,
+            )
         
         except Exception as e:
             logger.error(f"Email fetch failed: {e}")
-            config.last_error = str(e)
-            config.status = MailboxConfig.Status.ERROR
-            config.save()
+            MailboxConfig.objects.filter(pk=config.pk).update(
+                last_error=str(e),
+                status=MailboxConfig.Status.ERROR,
+                updated_at=timezone.now(),
+            )
             stats['errors'].append(str(e))
+            reuse_connection = False
         
         finally:
-            reader.disconnect()
+            reader.disconnect(reuse=reuse_connection)
         
         return stats
     
-    def _sanitize_filename(self, filename: str) -> str:
-        """Sanitize filename to prevent path traversal and invalid characters."""
-        import re
-        
-        # Remove path components
-        filename = Path(filename).name
-        
-        # Only allow safe characters
-        safe_filename = re.sub(r'[^\w\s\-\.]', '', filename)
-        safe_filename = safe_filename.replace('..', '')
-        
-        # Ensure it ends with .pdf
-        if not safe_filename.lower().endswith('.pdf'):
-            safe_filename += '.pdf'
+    def _ocr_attachment(self, email_attachment, user):
+        """Run OCR on one stored attachment (worker thread)."""
+        try:
+            # Stream the stored file instead of keeping the PDF bytes in memory
+            with email_attachment.file.open('rb') as stored_file:
+                return self.ocr_service.process_upload(
+                    File(stored_file, name=email_attachment.original_filename),
+                    user
+                )
+        finally:
+            # Worker threads get their own DB connection; don't leak it
+            db_connection.close()
+    
+    def _store_batch(self, config, emails: List, stats: Dict) -> List[Tuple]:
+        """
+        Store a batch of emails and their PDF files: one INSERT for the
+        imports, then one INSERT + UPDATE for the attachments of each email
+        under its own savepoint. An email whose attachments can't be stored
+        is marked failed without losing the rest of the batch. Emails
+        imported before are skipped. Returns (email_data, email_import,
+        [attachment, ...]) for the stored imports.
+        """
+        stored = []
+        try:
+            # Skip emails imported before without decoding their other headers
+            by_message_id = {email_data['message_id']: email_data for email_data in emails}
+            seen = set(EmailImport.objects.filter(
+                mailbox_config=config, email_message_id__in=list(by_message_id)
+            ).values_list('email_message_id', flat=True))
+            for message_id in seen:
+                logger.info(f"Email already processed: {message_id}")
+                del by_message_id[message_id]
+            
+            with transaction.atomic():
+                # Rows a concurrent fetch inserted meanwhile are left out
+                imports = EmailImport.create_bulk(config, [
+                    EmailImport(
+                        email_message_id=message_id,
+                        email_subject=email_data['subject'][:500],
+                        email_from=email_data['from'][:255],
+                        email_date=email_data['date'] or timezone.now(),
+                        email_body_preview=email_data['body_preview'],
+                        status=EmailImport.Status.PROCESSING
+                    )
+                    for message_id, email_data in by_message_id.items()
+                ])
+                
+                for message_id, email_data in by_message_id.items():
+                    email_import = imports.get(message_id)
+                    if email_import is None:
+                        continue
+                    stats['attachments_found'] += len(email_data['attachments'])
+                    
+                    try:
+                        with transaction.atomic():
+                            attachments = EmailAttachment.bulk_create_for_imports(
+                                (email_import, {
+                                    **attachment,
+                                    'filename': _sanitize_filename(attachment['filename']),
+                                })
+                                for attachment in email_data['attachments']
+                            )
+                    except Exception as e:
+                        logger.error(f"Error storing attachments of email {message_id}: {e}")
+                        stats['errors'].append(f"Bijlage fout: {str(e)}")
+                        email_import.status = EmailImport.Status.FAILED
+                        email_import.error_message = str(e)
+                        email_import.save(update_fields=['status', 'error_message', 'updated_at'])
+                        continue
+                    
+                    stored.append((email_data, email_import, attachments))
+        except Exception:
+            # The rollback leaves the written files behind in storage
+            EmailAttachment.delete_files(
+                email_attachment.file.name
+                for _email_data, _import, attachments in stored
+                for email_attachment in attachments
+            )
+            raise
+        finally:
+            # Duplicates and failed emails leave their spooled downloads open
+            _close_attachment_contents(emails)
         
-        # If empty, generate a name
-        if not safe_filename or safe_filename == '.pdf':
-            safe_filename = f"attachment_{uuid.uuid4().hex[:8]}.pdf"
+        return stored
+    
+    def _mark_awaiting_review(self, email_imports: List):
+        """Move fully processed imports to awaiting_review in one UPDATE."""
+        if not email_imports:
+            return
+        now = timezone.now()
+        EmailImport.objects.filter(
+            pk__in=[email_import.pk for email_import in email_imports]
+        ).update(
+            status=EmailImport.Status.AWAITING_REVIEW,
+            processed_at=now,
+            updated_at=now,
+        )
+    
+    def _link_ocr_results(self, futures: Dict) -> int:
+        """
+        Wait for the OCR futures and link the resulting InvoiceImports to
+        their attachments. Returns the number of attachments processed.
+        """
+        processed = 0
+        for future in as_completed(futures):
+            email_attachment = futures[future]
+            try:
+                # Link to email attachment
+                email_attachment.invoice_import = future.result()
+                email_attachment.is_processed = True
+                processed += 1
+            except Exception as e:
+                email_attachment.error_message = str(e)
+                logger.error(f"OCR processing failed for {email_attachment.original_filename}: {e}")
         
-        return safe_filename
+        if futures:
+            EmailAttachment.objects.bulk_update(
+                list(futures.values()), ['invoice_import', 'is_processed', 'error_message']
+            )
+        return processed
     
     def approve_import(self, email_import, user, notes: str = '') -> bool:
         """Approve an email import after review."""
-        from .models import EmailImport
-        
         email_import.status = EmailImport.Status.APPROVED
         email_import.reviewed_by = user
         email_import.reviewed_at = timezone.now()
         email_import.review_notes = notes
         email_import.save()
+        EmailImport.invalidate_cached_listings()
         
         return True
     
     def reject_import(self, email_import, user, notes: str = '') -> bool:
         """Reject an email import."""
-        from .models import EmailImport
-        
         email_import.status = EmailImport.Status.REJECTED
         email_import.reviewed_by = user
         email_import.reviewed_at = timezone.now()
         email_import.review_notes = notes
         email_import.save()
+        EmailImport.invalidate_cached_listings()
         
         return True
@@ -0,0 +1,48 @@
+"""
+Celery tasks for email import: mailbox fetches and maintenance.
+"""
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def delete_email_attachment_files(file_names):
+    """
+    Remove stored attachment files whose rows were deleted by
+    EmailImport.objects.bulk_purge().
+    """
+    from .models import EmailAttachment
+
+    EmailAttachment.delete_files(file_names)
+    logger.info('Removed %d purged attachment files', len(file_names))
+    return len(file_names)
+
+
+@shared_task(bind=True)
+def fetch_mailbox(self, config_id, user_id=None, limit=50):
+    """
+    Fetch a mailbox and process its PDF attachments outside the request
+    cycle. Routed to the email_queue (CELERY_TASK_ROUTES) so slow IMAP/Graph
+    sessions and OCR never hold a web worker.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import MailboxConfig
+    from .services import EmailImportService
+
+    try:
+        config = MailboxConfig.objects.get(pk=config_id)
+    except MailboxConfig.DoesNotExist:
+        logger.warning('Mailbox %s no longer exists, fetch task %s skipped', config_id, self.request.id)
+        return None
+
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+
+    # Statistics and errors are stored on the MailboxConfig by the service
+    stats = EmailImportService().fetch_and_process_emails(config, user=user, limit=limit)
+    logger.info(
+        'Mailbox %s fetched: %d emails, %d attachments processed',
+        config.name, stats['emails_processed'], stats['attachments_processed'],
+    )
+    return stats
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.invoicing.email_import.models import EmailAttachment, EmailImport, MailboxConfig
+
+
+class BulkPurgeTests(TestCase):
+    def setUp(self):
+        self.mailbox = MailboxConfig.objects.create(name='Facturen', email_address='facturen@example.com')
+        self.other_mailbox = MailboxConfig.objects.create(name='Inkoop', email_address='inkoop@example.com')
+        self.cutoff = timezone.now() - timedelta(days=30)
+
+        self.old_import = self._import(self.mailbox, 'old', days_ago=60)
+        self.new_import = self._import(self.mailbox, 'new', days_ago=1)
+        self.other_old_import = self._import(self.other_mailbox, 'other-old', days_ago=60)
+
+    def _import(self, mailbox, message_id, days_ago):
+        email_import = EmailImport.objects.create(
+            mailbox_config=mailbox,
+            email_message_id=message_id,
+            email_subject=message_id,
+            email_from='leverancier@example.com',
+            email_date=timezone.now(),
+        )
+        EmailImport.objects.filter(pk=email_import.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        EmailAttachment.objects.create(
+            email_import=email_import,
+            original_filename=f'{message_id}.pdf',
+            file=f'imports/email_attachments/{message_id}.pdf',
+            content_type='application/pdf',
+        )
+        return email_import
+
+    @patch('apps.invoicing.email_import.tasks.delete_email_attachment_files.delay')
+    def test_purges_only_older_imports_of_the_mailbox(self, mock_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = EmailImport.objects.bulk_purge(self.mailbox.pk, self.cutoff)
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(
+            set(EmailImport.objects.values_list('email_message_id', flat=True)),
+            {'new', 'other-old'},
+        )
+        self.assertFalse(EmailAttachment.objects.filter(email_import_id=self.old_import.pk).exists())
+        self.assertEqual(EmailAttachment.objects.count(), 2)
+        mock_delay.assert_called_once_with(['imports/email_attachments/old.pdf'])
+
+    @patch('apps.invoicing.email_import.tasks.delete_email_attachment_files.delay')
+    def test_nothing_to_purge(self, mock_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = EmailImport.objects.bulk_purge(self.mailbox.pk, timezone.now() - timedelta(days=90))
+
+        self.assertEqual(deleted, 0)
+        self.assertEqual(EmailImport.objects.count(), 3)
+        mock_delay.assert_not_called()
+
+    @patch('apps.invoicing.email_import.models.EmailAttachment.delete_files')
+    def test_cleanup_task_deletes_the_files(self, mock_delete_files):
+        from apps.invoicing.email_import.tasks import delete_email_attachment_files
+
+        delete_email_attachment_files(['a.pdf', 'b.pdf'])
+
+        mock_delete_files.assert_called_once_with(['a.pdf', 'b.pdf'])
@@ -0,0 +1,130 @@
+import imaplib
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from apps.invoicing.email_import.connection_pool import ImapPool
+
+
+class FakeIMAP4SSL:
+    """Stand-in for imaplib.IMAP4_SSL that records NOOP and LOGOUT."""
+
+    def __init__(self, name, noop_error=None, logout_error=None):
+        self.name = name
+        self.noop_error = noop_error
+        self.logout_error = logout_error
+        self.noops = 0
+        self.logged_out = False
+
+    def noop(self):
+        self.noops += 1
+        if self.noop_error:
+            raise self.noop_error
+        return 'OK', [b'NOOP completed']
+
+    def logout(self):
+        self.logged_out = True
+        if self.logout_error:
+            raise self.logout_error
+        return 'BYE', [b'Logging out']
+
+
+@patch('apps.invoicing.email_import.connection_pool.time.monotonic')
+class ImapPoolTests(TestCase):
+    def setUp(self):
+        self.pool = ImapPool(max_idle=25 * 60, max_size=2)
+
+    def test_connects_when_nothing_is_pooled(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        fresh = FakeIMAP4SSL('fresh')
+        connect = Mock(return_value=fresh)
+
+        self.assertIs(self.pool.acquire('a', connect), fresh)
+        connect.assert_called_once_with()
+
+    def test_reuses_released_connection_after_noop(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        pooled = FakeIMAP4SSL('pooled')
+        self.pool.release('a', pooled)
+        connect = Mock()
+
+        self.assertIs(self.pool.acquire('a', connect), pooled)
+        self.assertEqual(pooled.noops, 1)
+        connect.assert_not_called()
+
+    def test_connection_is_checked_out_while_in_use(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        pooled = FakeIMAP4SSL('pooled')
+        self.pool.release('a', pooled)
+        self.pool.acquire('a', Mock())
+        fresh = FakeIMAP4SSL('fresh')
+
+        self.assertIs(self.pool.acquire('a', Mock(return_value=fresh)), fresh)
+
+    def test_reconnects_when_noop_fails(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        dead = FakeIMAP4SSL('dead', noop_error=imaplib.IMAP4.abort('socket error: EOF'))
+        self.pool.release('a', dead)
+        fresh = FakeIMAP4SSL('fresh')
+
+        self.assertIs(self.pool.acquire('a', Mock(return_value=fresh)), fresh)
+        self.assertTrue(dead.logged_out)
+
+    def test_expires_connections_idle_too_long(self, mock_monotonic):
+        idle = FakeIMAP4SSL('idle')
+        other = FakeIMAP4SSL('other')
+        mock_monotonic.return_value = 0
+        self.pool.release('a', idle)
+        self.pool.release('b', other)
+
+        mock_monotonic.return_value = 25 * 60 + 1
+        fresh = FakeIMAP4SSL('fresh')
+
+        self.assertIs(self.pool.acquire('a', Mock(return_value=fresh)), fresh)
+        self.assertEqual(idle.noops, 0)
+        self.assertTrue(idle.logged_out)
+        # Expired entries of other mailboxes are logged out on the same pass
+        self.assertTrue(other.logged_out)
+
+    def test_keeps_connections_within_idle_time(self, mock_monotonic):
+        pooled = FakeIMAP4SSL('pooled')
+        mock_monotonic.return_value = 0
+        self.pool.release('a', pooled)
+
+        mock_monotonic.return_value = 25 * 60 - 1
+
+        self.assertIs(self.pool.acquire('a', Mock()), pooled)
+        self.assertFalse(pooled.logged_out)
+
+    def test_evicts_least_recently_used_above_max_size(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        first, second, third = FakeIMAP4SSL('a'), FakeIMAP4SSL('b'), FakeIMAP4SSL('c')
+        self.pool.release('a', first)
+        self.pool.release('b', second)
+        # Using 'a' again makes 'b' the least recently used
+        self.pool.release('a', self.pool.acquire('a', Mock()))
+        self.pool.release('c', third)
+
+        self.assertTrue(second.logged_out)
+        self.assertFalse(first.logged_out)
+        self.assertFalse(third.logged_out)
+        self.assertIs(self.pool.acquire('a', Mock()), first)
+        self.assertIs(self.pool.acquire('c', Mock()), third)
+
+    def test_release_replaces_other_connection_for_key(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        old, new = FakeIMAP4SSL('old'), FakeIMAP4SSL('new')
+        self.pool.release('a', old)
+        self.pool.release('a', new)
+
+        self.assertTrue(old.logged_out)
+        self.assertIs(self.pool.acquire('a', Mock()), new)
+
+    def test_discard_logs_out_without_pooling(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        broken = FakeIMAP4SSL('broken', logout_error=OSError('connection reset'))
+
+        self.pool.discard(broken)
+
+        self.assertTrue(broken.logged_out)
+        fresh = FakeIMAP4SSL('fresh')
+        self.assertIs(self.pool.acquire('a', Mock(return_value=fresh)), fresh)
@@ -0,0 +1,305 @@
+import email
+import imaplib
+from email.mime.application import MIMEApplication
+from email.mime.message import MIMEMessage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from unittest import TestCase
+from unittest.mock import Mock
+
+from apps.invoicing.email_import.services import (
+    IMAPEmailReader,
+    _parse_imap_list,
+    _parse_list_line,
+    _part_by_number,
+    _pdf_part_numbers,
+    _read_list_token,
+    _tail_of_sequence_set,
+)
+
+PDF_BYTES = b'%PDF-1.4 test'
+
+
+def _pdf_part(filename):
+    part = MIMEApplication(PDF_BYTES, 'pdf')
+    part.add_header('Content-Disposition', 'attachment', filename=filename)
+    return part
+
+
+def _parsed(msg):
+    return email.message_from_bytes(msg.as_bytes())
+
+
+class ParseListLineTests(TestCase):
+    def test_quoted_delimiter_and_name(self):
+        self.assertEqual(
+            _parse_list_line('(\\HasNoChildren) "/" "INBOX/Facturen"'),
+            ('\\HasNoChildren', '/', 'INBOX/Facturen'),
+        )
+
+    def test_escaped_quotes_and_backslashes_in_name(self):
+        self.assertEqual(
+            _parse_list_line(r'(\HasNoChildren) "." "Klant \"Jansen\" \\ 2024"'),
+            ('\\HasNoChildren', '.', 'Klant "Jansen" \\ 2024'),
+        )
+
+    def test_nil_delimiter(self):
+        self.assertEqual(
+            _parse_list_line('(\\Noinferiors) NIL "Outbox"'),
+            ('\\Noinferiors', None, 'Outbox'),
+        )
+
+    def test_unquoted_name(self):
+        self.assertEqual(
+            _parse_list_line('(\\HasChildren) "/" INBOX'),
+            ('\\HasChildren', '/', 'INBOX'),
+        )
+
+    def test_malformed_lines(self):
+        for line in [
+            '',
+            '* LIST',
+            '(\\HasNoChildren "/" "INBOX"',
+            '(\\HasNoChildren)',
+            '(\\HasNoChildren) "/"',
+            '(\\HasNoChildren) "/" NIL',
+        ]:
+            with self.subTest(line=line):
+                self.assertIsNone(_parse_list_line(line))
+
+    def test_read_list_token_returns_end_position(self):
+        self.assertEqual(_read_list_token('"a b" rest', 0), ('a b', 5))
+        self.assertEqual(_read_list_token('atom rest', 0), ('atom', 4))
+        self.assertEqual(_read_list_token('nil', 0), (None, 3))
+
+
+class ListFoldersTests(TestCase):
+    def _reader(self, folder_list):
+        reader = IMAPEmailReader('imap.example.com', 993, 'user', 'secret')
+        reader.connection = Mock()
+        reader.connection.list.return_value = ('OK', folder_list)
+        return reader
+
+    def test_literal_name_from_tuple(self):
+        reader = self._reader([
+            (b'(\\HasNoChildren) "/" {16}', b'INBOX/Fact "uur"'),
+            b'(\\HasChildren) "/" "INBOX"',
+        ])
+
+        folders = reader.list_folders()
+
+        self.assertEqual([folder['name'] for folder in folders], ['INBOX', 'INBOX/Fact "uur"'])
+        self.assertEqual(folders[1]['display_name'], 'Fact "uur"')
+        self.assertEqual(folders[1]['depth'], 1)
+        self.assertTrue(folders[0]['has_children'])
+
+    def test_skips_malformed_lines_and_handles_nil_delimiter(self):
+        reader = self._reader([
+            b'garbage',
+            None,
+            b'(\\Noinferiors) NIL "Outbox/2024"',
+        ])
+
+        folders = reader.list_folders()
+
+        self.assertEqual(len(folders), 1)
+        self.assertEqual(folders[0]['display_name'], 'Outbox/2024')
+        self.assertEqual(folders[0]['depth'], 0)
+
+
+class ParseImapListTests(TestCase):
+    def test_nested_lists_nil_escapes_and_literals(self):
+        # imaplib hands a literal over as a separate tuple item; joined, its
+        # bytes follow the {size} marker directly
+        data = b'* 1 FETCH (("a" NIL) "say \\"hi\\"" {5}ab cd atom)'
+
+        self.assertEqual(
+            _parse_imap_list(data, data.index(b'(')),
+            [[b'a', None], b'say "hi"', b'ab cd', b'atom'],
+        )
+
+    def test_unterminated_list(self):
+        with self.assertRaises(ValueError):
+            _parse_imap_list(b'("a" ("b")', 0)
+
+
+class PdfPartNumbersTests(TestCase):
+    def _structure(self, data):
+        return _parse_imap_list(data, 0)
+
+    def test_single_part_pdf(self):
+        structure = self._structure(b'("application" "pdf" ("name" "a.pdf") NIL NIL "base64" 100 NIL NIL NIL NIL)')
+
+        self.assertEqual(_pdf_part_numbers(structure), ['1'])
+
+    def test_nested_multiparts(self):
+        structure = self._structure(
+            b'((("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 10 1 NIL NIL NIL)'
+            b'("text" "html" ("charset" "utf-8") NIL NIL "7bit" 20 1 NIL NIL NIL) "alternative")'
+            b'("application" "pdf" ("name" "factuur.pdf") NIL NIL "base64" 1000 NIL'
+            b' ("attachment" ("filename" "factuur.pdf")) NIL NIL)'
+            b'(("image" "png" NIL NIL NIL "base64" 50 NIL NIL NIL NIL)'
+            b'("application" "x-download" ("name" "bon.PDF") NIL NIL "base64" 80 NIL NIL NIL NIL) "mixed")'
+            b' "mixed" ("boundary" "b1") NIL NIL)'
+        )
+
+        self.assertEqual(_pdf_part_numbers(structure), ['2', '3.2'])
+
+    def test_no_pdf_parts(self):
+        structure = self._structure(
+            b'(("text" "plain" NIL NIL NIL "7bit" 10 1 NIL NIL NIL)'
+            b'("image" "png" ("name" "logo.png") NIL NIL "base64" 50 NIL NIL NIL NIL) "mixed")'
+        )
+
+        self.assertEqual(_pdf_part_numbers(structure), [])
+
+    def test_encapsulated_message_cannot_be_mapped(self):
+        structure = self._structure(
+            b'(("text" "plain" NIL NIL NIL "7bit" 10 1 NIL NIL NIL)'
+            b'("message" "rfc822" NIL NIL NIL "7bit" 500 NIL'
+            b' ("application" "pdf" NIL NIL NIL "base64" 100 NIL NIL NIL NIL) 20 NIL NIL NIL) "mixed")'
+        )
+
+        self.assertIsNone(_pdf_part_numbers(structure))
+
+    def test_malformed_structure(self):
+        with self.assertRaises(ValueError):
+            _pdf_part_numbers([None, b'pdf'])
+
+
+class PartByNumberTests(TestCase):
+    def setUp(self):
+        inner = MIMEMultipart('mixed')
+        inner.attach(MIMEText('logo'))
+        inner.attach(_pdf_part('bon.pdf'))
+        outer = MIMEMultipart('mixed')
+        outer.attach(MIMEText('body'))
+        outer.attach(_pdf_part('factuur.pdf'))
+        outer.attach(inner)
+        self.msg = _parsed(outer)
+
+    def test_nested_part_numbers(self):
+        self.assertEqual(_part_by_number(self.msg, '2').get_filename(), 'factuur.pdf')
+        self.assertEqual(_part_by_number(self.msg, '3.2').get_filename(), 'bon.pdf')
+
+    def test_single_part_message(self):
+        msg = _parsed(_pdf_part('factuur.pdf'))
+
+        self.assertIs(_part_by_number(msg, '1'), msg)
+        with self.assertRaises(ValueError):
+            _part_by_number(msg, '2')
+
+    def test_structure_that_does_not_match_the_message(self):
+        with self.assertRaises(IndexError):
+            _part_by_number(self.msg, '4')
+        with self.assertRaises(ValueError):
+            _part_by_number(self.msg, '2.1')
+
+
+class ExtractAttachmentsTests(TestCase):
+    def setUp(self):
+        self.reader = IMAPEmailReader('imap.example.com', 993, 'user', 'secret')
+
+    def _filenames(self, msg, pdf_part_numbers):
+        return [
+            attachment['filename']
+            for attachment in self.reader._extract_attachments(msg, pdf_part_numbers)
+        ]
+
+    def test_uses_part_numbers(self):
+        outer = MIMEMultipart('mixed')
+        outer.attach(MIMEText('body'))
+        outer.attach(_pdf_part('factuur.pdf'))
+        outer.attach(_pdf_part('bijlage.pdf'))
+
+        self.assertEqual(self._filenames(_parsed(outer), ['3']), ['bijlage.pdf'])
+
+    def test_mismatched_structure_falls_back_to_walk(self):
+        outer = MIMEMultipart('mixed')
+        outer.attach(MIMEText('body'))
+        outer.attach(_pdf_part('factuur.pdf'))
+
+        self.assertEqual(self._filenames(_parsed(outer), ['5']), ['factuur.pdf'])
+
+    def test_encapsulated_message_is_walked(self):
+        forwarded = MIMEMultipart('mixed')
+        forwarded.attach(MIMEText('original'))
+        forwarded.attach(_pdf_part('doorgestuurd.pdf'))
+        outer = MIMEMultipart('mixed')
+        outer.attach(MIMEText('zie bijlage'))
+        outer.attach(MIMEMessage(forwarded))
+
+        # _pdf_part_numbers gives None for message/rfc822, so every node is walked
+        self.assertEqual(self._filenames(_parsed(outer), None), ['doorgestuurd.pdf'])
+
+
+class TailOfSequenceSetTests(TestCase):
+    def test_range(self):
+        self.assertEqual(_tail_of_sequence_set(b'1:5000', 3), [b'4998', b'4999', b'5000'])
+
+    def test_reversed_range(self):
+        self.assertEqual(_tail_of_sequence_set(b'10:8', 2), [b'9', b'10'])
+
+    def test_comma_list_spanning_parts(self):
+        self.assertEqual(
+            _tail_of_sequence_set(b'1:3,7,9:10', 4),
+            [b'3', b'7', b'9', b'10'],
+        )
+
+    def test_limit_larger_than_set(self):
+        self.assertEqual(
+            _tail_of_sequence_set(b'2,4:6', 50),
+            [b'2', b'4', b'5', b'6'],
+        )
+
+
+class SearchIdsTests(TestCase):
+    def _reader(self, capabilities=('IMAP4REV1', 'ESEARCH')):
+        reader = IMAPEmailReader('imap.example.com', 993, 'user', 'secret')
+        reader.connection = Mock()
+        reader.connection.capabilities = capabilities
+        return reader
+
+    def test_esearch_returns_tail_of_sequence_set(self):
+        reader = self._reader()
+        reader.connection.uid.return_value = ('OK', [None])
+        reader.connection.response.return_value = ('ESEARCH', [b'(TAG "A5") UID ALL 1:3,7'])
+
+        self.assertEqual(reader._search_ids('UNSEEN', 2), [b'3', b'7'])
+        reader.connection.uid.assert_called_once_with('SEARCH', 'RETURN (ALL)', 'UNSEEN')
+
+    def test_esearch_without_matches(self):
+        reader = self._reader()
+        reader.connection.uid.return_value = ('OK', [None])
+        reader.connection.response.return_value = ('ESEARCH', [b'(TAG "A5") UID'])
+
+        self.assertEqual(reader._search_ids('UNSEEN', 10), [])
+
+    def test_falls_back_to_search_when_esearch_is_refused(self):
+        reader = self._reader()
+        reader.connection.uid.side_effect = [
+            imaplib.IMAP4.error('SEARCH command error: BAD'),
+            ('OK', [b'4 5 6']),
+        ]
+
+        self.assertEqual(reader._search_ids('UNSEEN', 2), [b'5', b'6'])
+        self.assertEqual(reader.connection.uid.call_args.args, ('SEARCH', None, 'UNSEEN'))
+
+    def test_falls_back_to_search_when_esearch_is_rejected(self):
+        reader = self._reader()
+        reader.connection.uid.side_effect = [('NO', [b'unsupported']), ('OK', [b'4 5 6'])]
+
+        self.assertEqual(reader._search_ids('ALL', 10), [b'4', b'5', b'6'])
+
+    def test_plain_search_without_esearch_capability(self):
+        reader = self._reader(capabilities=('IMAP4REV1',))
+        reader.connection.uid.return_value = ('OK', [b'1 2 3'])
+
+        self.assertEqual(reader._search_ids('ALL', 0), [b'1', b'2', b'3'])
+        reader.connection.uid.assert_called_once_with('SEARCH', None, 'ALL')
+
+    def test_failed_search(self):
+        reader = self._reader(capabilities=('IMAP4REV1',))
+        reader.connection.uid.return_value = ('NO', [None])
+
+        self.assertIsNone(reader._search_ids('ALL', 10))
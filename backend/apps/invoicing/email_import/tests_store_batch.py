@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.invoicing.email_import.models import EmailAttachment, EmailImport, MailboxConfig
+from apps.invoicing.email_import.services import EmailImportService
+
+PDF_BYTES = b'%PDF-1.4 test'
+
+
+def _email(message_id, *filenames, content=PDF_BYTES):
+    return {
+        'message_id': message_id,
+        'subject': f'Factuur {message_id}',
+        'from': 'leverancier@example.com',
+        'date': timezone.now(),
+        'body_preview': '',
+        'attachments': [
+            {
+                'filename': filename,
+                'content': content,
+                'content_type': 'application/pdf',
+                'size': len(PDF_BYTES),
+            }
+            for filename in filenames
+        ],
+    }
+
+
+class StoreBatchTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.mailbox = MailboxConfig.objects.create(name='Facturen', email_address='facturen@example.com')
+        self.service = EmailImportService()
+        self.stats = {'attachments_found': 0, 'errors': []}
+        self.storage = EmailAttachment._meta.get_field('file').storage
+
+    def _failing_save(self, filename, written):
+        """storage.save that fails for `filename` and records the other stored names."""
+        save = self.storage.save
+
+        def failing_save(name, content, max_length=None):
+            if name.endswith(filename):
+                raise OSError('disk full')
+            stored_name = save(name, content, max_length=max_length)
+            written.append(stored_name)
+            return stored_name
+
+        return patch.object(self.storage, 'save', side_effect=failing_save)
+
+    def _message_ids(self, stored):
+        return [email_import.email_message_id for _email_data, email_import, _attachments in stored]
+
+    def test_skips_message_ids_imported_before(self):
+        self.service._store_batch(self.mailbox, [_email('<a@x>', 'a.pdf')], self.stats)
+
+        stored = self.service._store_batch(
+            self.mailbox, [_email('<a@x>', 'a.pdf'), _email('<b@x>', 'b.pdf')], self.stats
+        )
+
+        self.assertEqual(self._message_ids(stored), ['<b@x>'])
+        self.assertEqual(EmailImport.objects.filter(email_message_id='<a@x>').count(), 1)
+        self.assertEqual(EmailAttachment.objects.count(), 2)
+
+    def test_failed_write_marks_only_that_import_failed(self):
+        written = []
+        with self._failing_save('kapot.pdf', written):
+            stored = self.service._store_batch(
+                self.mailbox,
+                [_email('<a@x>', 'goed.pdf'), _email('<b@x>', 'eerst.pdf', 'kapot.pdf')],
+                self.stats,
+            )
+
+        self.assertEqual(self._message_ids(stored), ['<a@x>'])
+        failed = EmailImport.objects.get(email_message_id='<b@x>')
+        self.assertEqual(failed.status, EmailImport.Status.FAILED)
+        self.assertIn('disk full', failed.error_message)
+        self.assertEqual(
+            EmailImport.objects.get(email_message_id='<a@x>').status, EmailImport.Status.PROCESSING
+        )
+        self.assertEqual(len(self.stats['errors']), 1)
+
+        # Only the healthy email keeps its row and file; eerst.pdf is removed again
+        kept = list(EmailAttachment.objects.values_list('file', flat=True))
+        self.assertEqual(len(kept), 1)
+        self.assertEqual(len(written), 2)
+        for name in written:
+            self.assertEqual(self.storage.exists(name), name in kept)
+
+    def test_outer_rollback_removes_stored_files(self):
+        written = []
+        # Recording the failure of the second email breaks the batch transaction
+        with self._failing_save('kapot.pdf', written), \
+                patch.object(EmailImport, 'save', side_effect=RuntimeError('database gone')):
+            with self.assertRaises(RuntimeError):
+                self.service._store_batch(
+                    self.mailbox,
+                    [_email('<a@x>', 'goed.pdf'), _email('<b@x>', 'kapot.pdf')],
+                    self.stats,
+                )
+
+        self.assertFalse(EmailImport.objects.exists())
+        self.assertEqual(len(written), 1)
+        self.assertFalse(self.storage.exists(written[0]))
+
+    def test_closes_spooled_contents(self):
+        self.service._store_batch(self.mailbox, [_email('<a@x>', 'a.pdf')], self.stats)
+        duplicate = tempfile.SpooledTemporaryFile()
+        duplicate.write(PDF_BYTES)
+        new = tempfile.SpooledTemporaryFile()
+        new.write(PDF_BYTES)
+        new.seek(0)
+
+        self.service._store_batch(
+            self.mailbox,
+            [_email('<a@x>', 'a.pdf', content=duplicate), _email('<b@x>', 'b.pdf', content=new)],
+            self.stats,
+        )
+
+        self.assertTrue(duplicate.closed)
+        self.assertTrue(new.closed)
+        stored = EmailAttachment.objects.get(email_import__email_message_id='<b@x>')
+        with stored.file.open('rb') as stored_file:
+            self.assertEqual(stored_file.read(), PDF_BYTES)
@@ -3,27 +3,47 @@ Email Import Views
 
 API endpoints for managing email invoice imports.
 """
+import hashlib
 import logging
+from datetime import datetime, time, timedelta
+import orjson
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.http import HttpResponse
 from django.utils import timezone
 from apps.core.permissions import IsAdminOnly, IsAdminOrManager
+from apps.core.renderers import OrjsonRenderer
 
 from .models import MailboxConfig, EmailImport, EmailAttachment
 from .serializers import (
     MailboxConfigSerializer, MailboxConfigDetailSerializer,
-    EmailImportSerializer, EmailImportDetailSerializer, EmailImportReviewSerializer,
+    EmailImportSerializer, EmailImportSummarySerializer, EmailImportDetailSerializer,
+    EmailImportReviewSerializer,
     EmailAttachmentSerializer, TestConnectionSerializer, FetchEmailsSerializer,
-    BulkDeleteSerializer
+    BulkDeleteSerializer, include_extracted
 )
 from .services import EmailImportService
+from .tasks import fetch_mailbox
 from apps.core.throttling import EmailImportRateThrottle
 
 logger = logging.getLogger(__name__)
 
+# Polled by the review dashboard; writes move the cache keys, the TTL only
+# bounds staleness when the version key itself was evicted
+EMAIL_IMPORT_CACHE_TTL = 30
+
+
+def _import_list_serializer_class(request):
+    """List serializer for imports; ?attachments=false leaves out the nested attachments."""
+    if request.query_params.get('attachments', '').lower() in ('0', 'false'):
+        return EmailImportSummarySerializer
+    return EmailImportSerializer
+
 
 class EmailImportPagination(PageNumberPagination):
     """Pagination for email imports."""
@@ -40,6 +60,28 @@ class MailboxConfigViewSet(viewsets.ModelViewSet):
     Staff can view and trigger fetches.
     """
     pagination_class = EmailImportPagination
+    renderer_classes = [OrjsonRenderer, BrowsableAPIRenderer]
+    
+    # Columns read by MailboxConfigSerializer (plus the user's name parts)
+    LIST_FIELDS = (
+        'id', 'name', 'description', 'protocol', 'status', 'email_address',
+        'folder_name', 'folder_display_name', 'default_invoice_type',
+        'auto_fetch_enabled', 'auto_fetch_interval_minutes', 'last_fetch_at',
+        'total_emails_processed', 'total_invoices_imported', 'created_by',
+        'created_at', 'updated_at',
+        'created_by__voornaam', 'created_by__achternaam', 'created_by__email',
+    )
+    
+    # Columns read by the import list serializers in the imports action;
+    # leaves out the message id, error and review notes and the mailbox
+    # and reviewer columns the list does not show
+    IMPORT_LIST_FIELDS = (
+        'id', 'mailbox_config', 'email_subject', 'email_from', 'email_date',
+        'email_body_preview', 'status', 'processed_at', 'reviewed_by', 'reviewed_at',
+        'created_at', 'updated_at',
+        'mailbox_config__name', 'mailbox_config__default_invoice_type',
+        'reviewed_by__voornaam', 'reviewed_by__achternaam', 'reviewed_by__email',
+    )
     
     def get_permissions(self):
         """Set permissions based on action."""
@@ -55,12 +97,17 @@ class MailboxConfigViewSet(viewsets.ModelViewSet):
         """Return configs accessible to the user."""
         user = self.request.user
         
+        queryset = MailboxConfigSerializer.setup_eager_loading(MailboxConfig.objects.all())
+        if self.action == 'list':
+            # The list never shows the encrypted credentials or filter settings
+            queryset = queryset.only(*self.LIST_FIELDS)
+        
         # Admins see all
         if user.is_superuser or user.rol == 'admin':
-            return MailboxConfig.objects.all()
+            return queryset
         
         # Regular users see only active configs they created
-        return MailboxConfig.objects.filter(
+        return queryset.filter(
             Q(created_by=user) | Q(status=MailboxConfig.Status.ACTIVE)
         )
     
@@ -74,6 +121,11 @@ class MailboxConfigViewSet(viewsets.ModelViewSet):
         """Set created_by on create."""
         serializer.save(created_by=self.request.user)
     
+    def perform_destroy(self, instance):
+        """Deleting a mailbox cascades to its imports."""
+        super().perform_destroy(instance)
+        EmailImport.invalidate_cached_listings()
+    
     @action(detail=True, methods=['post'], throttle_classes=[EmailImportRateThrottle])
     def test_connection(self, request, pk=None):
         """Test the connection to the mailbox."""
@@ -122,32 +174,34 @@ class MailboxConfigViewSet(viewsets.ModelViewSet):
         
         limit = serializer.validated_data.get('limit', 50)
         
-        service = EmailImportService()
-        
+        # The IMAP/Graph session and OCR run on the email_queue worker
         try:
-            stats = service.fetch_and_process_emails(
-                config, 
-                user=request.user,
-                limit=limit
-            )
-            
-            return Response({
-                'success': True,
-                'stats': stats
-            })
+            task = fetch_mailbox.delay(str(config.pk), str(request.user.pk), limit)
         except Exception as e:
-            logger.error(f"Email fetch failed: {e}")
+            logger.error(f"Email fetch could not be queued: {e}")
             return Response({
                 'success': False,
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            'success': True,
+            'task_id': task.id,
+            'status': 'queued'
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
     def imports(self, request, pk=None):
         """Get email imports for this mailbox."""
         config = self.get_object()
         
-        imports = EmailImport.objects.filter(mailbox_config=config)
+        serializer_class = _import_list_serializer_class(request)
+        with_extracted = include_extracted(request)
+        imports = serializer_class.setup_eager_loading(
+            EmailImport.objects.filter(mailbox_config=config), include_extracted=with_extracted
+        ).only(*self.IMPORT_LIST_FIELDS).annotate(
+            attachment_count=Count('attachments')
+        ).order_by('-email_date', '-created_at')  # served by the (mailbox_config, -email_date) index
         
         # Filter by status if provided
         status_filter = request.query_params.get('status')
@@ -155,12 +209,13 @@ class MailboxConfigViewSet(viewsets.ModelViewSet):
             imports = imports.filter(status=status_filter)
         
         # Paginate
+        context = {'request': request, 'include_extracted': with_extracted}
         page = self.paginate_queryset(imports)
         if page is not None:
-            serializer = EmailImportSerializer(page, many=True, context={'request': request})
+            serializer = serializer_class(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
         
-        serializer = EmailImportSerializer(imports, many=True, context={'request': request})
+        serializer = serializer_class(imports, many=True, context=context)
         return Response(serializer.data)
 
 
@@ -173,14 +228,20 @@ class EmailImportViewSet(viewsets.ModelViewSet):
     """
     pagination_class = EmailImportPagination
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManager]
+    renderer_classes = [OrjsonRenderer, BrowsableAPIRenderer]
     http_method_names = ['get', 'post', 'head', 'options']  # No PUT/DELETE
     
     def get_queryset(self):
         """Return imports accessible to the user."""
         user = self.request.user
-        queryset = EmailImport.objects.select_related(
-            'mailbox_config', 'reviewed_by'
-        ).prefetch_related('attachments')
+        queryset = self.get_serializer_class().setup_eager_loading(
+            EmailImport.objects.all(), include_extracted=self._include_extracted()
+        )
+        
+        # attachment_count for the serializers; not for statistics, where the
+        # JOIN would skew the per-status counts
+        if self.action in ('list', 'retrieve', 'pending_review'):
+            queryset = queryset.annotate(attachment_count=Count('attachments'))
         
         # Filter by status if provided
         status_filter = self.request.query_params.get('status')
@@ -214,7 +275,40 @@ class EmailImportViewSet(viewsets.ModelViewSet):
         """Use detail serializer for retrieve."""
         if self.action == 'retrieve':
             return EmailImportDetailSerializer
-        return EmailImportSerializer
+        return _import_list_serializer_class(self.request)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_extracted'] = self._include_extracted()
+        return context
+    
+    def _include_extracted(self):
+        """Detail always carries extracted_data; lists only with ?include=extracted."""
+        return self.action == 'retrieve' or include_extracted(self.request)
+    
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        EmailImport.invalidate_cached_listings()
+    
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        EmailImport.invalidate_cached_listings()
+    
+    def _cached_json(self, request, name, build_data):
+        """
+        Serve a polled endpoint as cached, rendered JSON bytes. The key covers
+        the user (get_queryset is per user), the full URL (filters, page) and
+        EmailImport.cache_version(), which every write to the imports bumps.
+        """
+        raw = f"{request.build_absolute_uri()}|{request.user.pk}|{EmailImport.cache_version()}"
+        cache_key = f"email_import:{name}:{hashlib.sha256(raw.encode()).hexdigest()}"
+        body = cache.get(cache_key)
+        if body is None:
+            body = OrjsonRenderer().render(build_data())
+            cache.set(cache_key, body, EMAIL_IMPORT_CACHE_TTL)
+        if isinstance(request.accepted_renderer, OrjsonRenderer):
+            return HttpResponse(body, content_type=OrjsonRenderer.media_type)
+        return Response(orjson.loads(body))
     
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
@@ -251,54 +345,53 @@ class EmailImportViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def pending_review(self, request):
         """Get all imports awaiting review with pagination."""
+        return self._cached_json(request, 'pending_review', self._pending_review_data)
+    
+    def _pending_review_data(self):
         queryset = self.get_queryset().filter(
             status=EmailImport.Status.AWAITING_REVIEW
         )
         
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = EmailImportSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data).data
         
-        serializer = EmailImportSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return serializer.data
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get import statistics."""
+        return self._cached_json(request, 'statistics', self._statistics_data)
+    
+    def _statistics_data(self):
         queryset = self.get_queryset()
         
-        # Get counts by status
-        from django.db.models import Count
-        
-        stats = queryset.values('status').annotate(
-            count=Count('id')
+        # Half-open range instead of created_at__date, which casts the
+        # column and so can't use an index on it
+        today_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        tomorrow_start = today_start + timedelta(days=1)
+        
+        # Total, today and per-status counts in one pass over the rows
+        counts = queryset.order_by().aggregate(
+            total=Count('id'),
+            today=Count('id', filter=Q(created_at__gte=today_start, created_at__lt=tomorrow_start)),
+            **{
+                value: Count('id', filter=Q(status=value))
+                for value in EmailImport.Status.values
+            }
         )
         
-        status_counts = {
-            'pending': 0,
-            'processing': 0,
-            'awaiting_review': 0,
-            'approved': 0,
-            'rejected': 0,
-            'completed': 0,
-            'failed': 0
-        }
-        
-        for item in stats:
-            status_counts[item['status']] = item['count']
+        total = counts.pop('total')
+        today = counts.pop('today')
+        status_counts = counts
         
-        # Total counts
-        total = queryset.count()
-        today = queryset.filter(
-            created_at__date=timezone.now().date()
-        ).count()
-        
-        return Response({
+        return {
             'total': total,
             'today': today,
             'by_status': status_counts
-        })
+        }
     
     @action(detail=False, methods=['post'])
     def bulk_delete(self, request):
@@ -313,6 +406,7 @@ class EmailImportViewSet(viewsets.ModelViewSet):
         
         deleted_count = queryset.count()
         queryset.delete()
+        EmailImport.invalidate_cached_listings()
         
         return Response({
             'success': True,
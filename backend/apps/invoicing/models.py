@@ -1,6 +1,8 @@
 """Invoicing models - To be fully implemented in Fase 5 & 6."""
 import uuid
+from decimal import Decimal
 from django.db import models
+from django.db.models import Sum
 from django.conf import settings
 
 
@@ -144,7 +146,8 @@ class Invoice(models.Model):
     
     def calculate_totals(self):
         """Herbereken alle totalen."""
-        self.subtotaal = sum(line.totaal for line in self.lines.all())
+        # SUM in de database in plaats van alle regels als model te laden
+        self.subtotaal = self.lines.aggregate(som=Sum('totaal'))['som'] or Decimal('0')
         self.btw_bedrag = self.subtotaal * (self.btw_percentage / 100)
         self.totaal = self.subtotaal + self.btw_bedrag
         # Creditfacturen: bedragen negatief opslaan
@@ -152,7 +155,7 @@ class Invoice(models.Model):
             self.subtotaal = -abs(self.subtotaal)
             self.btw_bedrag = -abs(self.btw_bedrag)
             self.totaal = -abs(self.totaal)
-        self.save()
+        self.save(update_fields=['subtotaal', 'btw_bedrag', 'totaal', 'updated_at'])
 
 
 class InvoiceLine(models.Model):
@@ -201,7 +204,22 @@ class InvoiceLine(models.Model):
     def save(self, *args, **kwargs):
         # Calculate line total
         self.totaal = self.aantal * self.prijs_per_eenheid
+        # Bij een gedeeltelijke save het afgeleide totaal meeschrijven
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'aantal', 'prijs_per_eenheid'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'totaal'}
         super().save(*args, **kwargs)
+    
+    @classmethod
+    def bulk_create_lines(cls, lines):
+        """
+        Maak regels aan met één multi-row INSERT per 500 regels. bulk_create
+        roept save() niet aan, dus het totaal wordt hier vooraf berekend.
+        """
+        lines = list(lines)
+        for line in lines:
+            line.totaal = line.aantal * line.prijs_per_eenheid
+        return cls.objects.bulk_create(lines, batch_size=500)
 
 
 class ExpenseCategory(models.TextChoices):
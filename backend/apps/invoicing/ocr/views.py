@@ -423,6 +423,7 @@ class InvoiceImportViewSet(viewsets.ModelViewSet):
         
         if line_items:
             # Use user-edited line items from frontend
+            lines = []
             for i, item in enumerate(line_items):
                 # Convert string values to proper types
                 aantal = item.get('aantal', 1)
@@ -439,18 +440,19 @@ class InvoiceImportViewSet(viewsets.ModelViewSet):
                     except:
                         prijs = 0
                 
-                InvoiceLine.objects.create(
+                lines.append(InvoiceLine(
                     invoice=invoice,
                     omschrijving=item.get('omschrijving', 'Regel'),
                     aantal=aantal or 1,
                     eenheid=item.get('eenheid', 'stuk') or 'stuk',
                     prijs_per_eenheid=prijs or 0,
                     volgorde=i,
-                )
+                ))
+            InvoiceLine.bulk_create_lines(lines)
         else:
             # Fall back to imported lines from OCR
-            for imported_line in invoice_import.lines.all():
-                InvoiceLine.objects.create(
+            InvoiceLine.bulk_create_lines(
+                InvoiceLine(
                     invoice=invoice,
                     omschrijving=imported_line.omschrijving or imported_line.raw_text or 'Regel',
                     aantal=imported_line.aantal or 1,
@@ -458,6 +460,8 @@ class InvoiceImportViewSet(viewsets.ModelViewSet):
                     prijs_per_eenheid=imported_line.prijs_per_eenheid or imported_line.totaal or 0,
                     volgorde=imported_line.volgorde,
                 )
+                for imported_line in invoice_import.lines.all()
+            )
         
         # Mark import as completed
         invoice_import.status = InvoiceImport.Status.COMPLETED
@@ -752,8 +756,8 @@ class InvoiceImportViewSet(viewsets.ModelViewSet):
                 )
                 
                 # Create lines
-                for imported_line in invoice_import.lines.all():
-                    InvoiceLine.objects.create(
+                InvoiceLine.bulk_create_lines(
+                    InvoiceLine(
                         invoice=invoice,
                         omschrijving=imported_line.omschrijving or imported_line.raw_text or 'Regel',
                         aantal=imported_line.aantal or 1,
@@ -761,6 +765,8 @@ class InvoiceImportViewSet(viewsets.ModelViewSet):
                         prijs_per_eenheid=imported_line.prijs_per_eenheid or imported_line.totaal or 0,
                         volgorde=imported_line.volgorde,
                     )
+                    for imported_line in invoice_import.lines.all()
+                )
                 
                 # Mark as completed
                 invoice_import.status = InvoiceImport.Status.COMPLETED
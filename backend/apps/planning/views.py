@@ -432,10 +432,12 @@ TMS
         Accessible to users with view_all_planning or manage_all_planning."""
         from apps.companies.models import Company
         from apps.companies.serializers import CompanySerializer
-        from apps.drivers.serializers import DriverSerializer
+        from apps.drivers.serializers import DriverSerializer, GEKOPPELDE_GEBRUIKER_NAAM
 
         companies = Company.objects.all().order_by('naam')
-        drivers = Driver.objects.select_related('bedrijf', 'gekoppelde_gebruiker', 'voertuig').all().order_by('naam')
+        drivers = Driver.objects.select_related('bedrijf', 'voertuig').annotate(
+            gekoppelde_gebruiker_naam=GEKOPPELDE_GEBRUIKER_NAAM
+        ).order_by('naam')
 
         return Response({
             'companies': CompanySerializer(companies, many=True).data,
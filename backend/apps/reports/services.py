@@ -282,7 +282,7 @@ def _execute_vehicle_overview(params):
     """Overzicht van alle voertuigen."""
     from apps.fleet.models import Vehicle
 
-    qs = Vehicle.objects.select_related('bedrijf').all()
+    qs = Vehicle.objects.for_list()
     actief = params.get('actief')
     if actief is not None:
         qs = qs.filter(actief=bool(actief))
@@ -294,7 +294,7 @@ def _execute_vehicle_overview(params):
             v.kenteken,
             v.type_wagen,
             v.ritnummer or '',
-            v.bedrijf.naam if v.bedrijf else '',
+            v.bedrijf_naam_cache,
             v.minimum_weken_per_jaar,
             'Ja' if v.actief else 'Nee',
         ])
@@ -561,7 +561,7 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
         vehicles = Vehicle.objects.filter(
             ritnummer__gt='',
             minimum_weken_per_jaar__isnull=False,
-        ).select_related('bedrijf')
+        ).for_list()
         
         if not vehicles.exists():
             return Response([])
@@ -594,7 +594,7 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
                     'vehicle_id': str(vehicle.id),
                     'kenteken': vehicle.kenteken,
                     'type_wagen': vehicle.type_wagen,
-                    'bedrijf_naam': vehicle.bedrijf.naam if vehicle.bedrijf else '',
+                    'bedrijf_naam': vehicle.bedrijf_naam_cache,
                     'minimum_weken_per_jaar': vehicle.minimum_weken_per_jaar,
                     '_created': vehicle.created_at,
                 }
@@ -257,6 +257,10 @@ LOGGING = {
     },
 }
 
+# The handlers of these loggers write from a background thread
+# (QueueListener), set up in CoreConfig.ready() via apps.core.log_queue
+LOG_QUEUED_LOGGERS = ['accounts.security']
+
 # Create logs directory if it doesn't exist
 LOGS_DIR = BASE_DIR / 'logs'
 LOGS_DIR.mkdir(exist_ok=True)
@@ -270,6 +274,12 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
 
+# Mailbox fetches hold IMAP/Graph sessions and run OCR; keep them on their
+# own queue so they never delay the short scheduled tasks
+CELERY_TASK_ROUTES = {
+    'apps.invoicing.email_import.tasks.fetch_mailbox': {'queue': 'email_queue'},
+}
+
 # Celery Beat Schedule
 CELERY_BEAT_SCHEDULE = {
     'process-scheduled-notifications': {
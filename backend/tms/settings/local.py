@@ -95,3 +95,6 @@ LOGGING = {
         },
     },
 }
+
+# Local runs log synchronously
+LOG_QUEUED_LOGGERS = []
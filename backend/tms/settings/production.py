@@ -125,5 +125,10 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': False,
         },
+        'accounts.security': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
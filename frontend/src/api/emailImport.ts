@@ -134,13 +134,8 @@ export interface EmailImportDetail extends EmailImport {
 
 export interface FetchEmailsResult {
   success: boolean;
-  stats: {
-    emails_found: number;
-    emails_processed: number;
-    attachments_found: number;
-    attachments_processed: number;
-    errors: string[];
-  };
+  task_id: string;
+  status: 'queued';
 }
 
 export interface EmailImportStats {
@@ -258,6 +253,7 @@ export const getEmailImports = async (params?: {
   date_to?: string;
   page?: number;
   page_size?: number;
+  include?: 'extracted';
 }): Promise<PaginatedResponse<EmailImport>> => {
   const queryParams = new URLSearchParams();
   if (params) {
@@ -56,7 +56,7 @@ const EmailImportPage: React.FC = () => {
   // Fetch email imports with pagination
   const { data: importsData, isLoading: importsLoading } = useQuery({
     queryKey: ['emailImports', currentPage, statusFilter],
-    queryFn: () => getEmailImports({ page: currentPage, page_size: 20, status: statusFilter || undefined }),
+    queryFn: () => getEmailImports({ page: currentPage, page_size: 20, status: statusFilter || undefined, include: 'extracted' }),
     refetchInterval: 10000, // Refresh every 10 seconds
   });
 
@@ -319,8 +319,7 @@ const EmailImportPage: React.FC = () => {
         {fetchEmailsMutation.isSuccess && (
           <div className="px-6 py-3 bg-green-50 border-t border-green-200">
             <p className="text-sm text-green-800">
-              ✅ {fetchEmailsMutation.data.stats.emails_processed} e-mails verwerkt,{' '}
-              {fetchEmailsMutation.data.stats.attachments_processed} bijlages geïmporteerd
+              ✅ E-mails worden op de achtergrond opgehaald; nieuwe imports verschijnen vanzelf in de lijst
             </p>
           </div>
         )}
@@ -675,7 +675,7 @@ services:
       dockerfile: Dockerfile
     container_name: tms-celery-worker
     restart: always
-    command: celery -A tms worker --loglevel=info --concurrency=2
+    command: celery -A tms worker -Q celery,email_queue --loglevel=info --concurrency=2
     depends_on:
       postgres:
         condition: service_healthy